@@ -80,3 +80,27 @@ class IsMemberOfManagement(BasePermission):
             user=request.user,
             group__name=authorized_group,
         ).exists()
+
+
+class HasEmployeePermission(BasePermission):
+    """
+    Check the ``required_permission`` (name) of the view against the effective permissions
+    of the employee (cached, see: authentication.principals), e.g:
+
+        class ClientListView(generics.ListAPIView):
+            permission_classes = [IsAuthenticated, HasEmployeePermission]
+            required_permission = "client.view"
+    """
+
+    def has_permission(self, request, view):
+        if request.user.is_superuser:
+            return True
+
+        required_permission: str | None = getattr(view, "required_permission", None)
+        if required_permission is None:
+            return True
+
+        from authentication.principals import get_principal
+
+        principal = get_principal(request.user.id)
+        return principal is not None and required_permission in principal["permissions"]
@@ -9,7 +9,7 @@ from ai.filters import AIGeneratedReportSchemaFilter
 from ai.models import AIGeneratedReport
 from ai.schemas import AIGeneratedReportSchema, ReportSchema, SmartFormulaResultSchema
 from ai.tasks import ai_summarize
-from ai.utils import ai_enhance_report, ai_smart_formula
+from ai.utils import ai_enhance_report, ai_smart_formulas
 from assessments.models import Assessment, AssessmentDomain
 from client.models import ClientDetails
 from client.schemas import DatePeriodSchema, ObjectiveProgressReportSchema
@@ -102,17 +102,18 @@ def ai_smart_formula_generator(
     if domain and assessment:
         goals: list[str] = assessment.parse_content_as_goals()
 
-        for goal in goals:
-            ai_objectives = ai_smart_formula(
-                goal=goal,
-                domain=domain.name,
-                format="JSON",
-                objective_number=3,
-                language="Netherlands Dutch",
-                start_date=period.start_date,
-                end_date=period.end_date,
-            )
-
+        # All the goals at once (concurrently), a failed goal has no objectives
+        goals_objectives = ai_smart_formulas(
+            goals=goals,
+            domain=domain.name,
+            format="JSON",
+            objective_number=3,
+            language="Netherlands Dutch",
+            start_date=period.start_date,
+            end_date=period.end_date,
+        )
+
+        for goal, ai_objectives in zip(goals, goals_objectives):
             result["goals"].append(
                 {
                     "goal_name": goal,
@@ -0,0 +1,84 @@
+"""
+Concurrent execution of the LLM calls (e.g. one call per goal or per client).
+
+The calls are issued concurrently with ``ainvoke``, bounded by a semaphore (``LLM_MAX_CONCURRENCY``)
+to stay within the OpenAI rate limits. Every call is given ``LLM_TIMEOUT`` seconds and retried
+(``LLM_MAX_RETRIES``, on top of the OpenAI client retries) with an exponential backoff on the
+transient errors, honoring the ``Retry-After`` of the rate limit errors.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import random
+from typing import Any, Sequence
+
+import openai
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from langchain_core.runnables import Runnable
+from loguru import logger
+
+RETRYABLE_ERRORS = (
+    asyncio.TimeoutError,
+    openai.APIConnectionError,  # (including the APITimeoutError)
+    openai.RateLimitError,
+    openai.InternalServerError,
+)
+
+
+def get_retry_delay(attempt: int, error: Exception) -> float:
+    """Exponential backoff with jitter (in seconds), or the delay requested by the rate limit"""
+    if isinstance(error, openai.RateLimitError):
+        retry_after = error.response.headers.get("retry-after")
+        try:
+            return min(float(retry_after), settings.LLM_RETRY_BACKOFF_MAX)
+        except (TypeError, ValueError):
+            pass
+
+    delay = min(settings.LLM_RETRY_BACKOFF * 2**attempt, settings.LLM_RETRY_BACKOFF_MAX)
+    return delay * random.uniform(0.5, 1)
+
+
+async def ainvoke(chain: Runnable, input: dict[str, Any], semaphore: asyncio.Semaphore) -> Any:
+    """Invoke the chain within the semaphore, with a timeout and retries"""
+    for attempt in range(settings.LLM_MAX_RETRIES + 1):
+        try:
+            async with semaphore:
+                return await asyncio.wait_for(chain.ainvoke(input), timeout=settings.LLM_TIMEOUT)
+        except RETRYABLE_ERRORS as e:
+            if attempt == settings.LLM_MAX_RETRIES:
+                raise
+
+            # (the semaphore is released while waiting)
+            delay = get_retry_delay(attempt, e)
+            logger.warning(f"LLM call failed ({type(e).__name__}), retrying in {delay:.1f}s.")
+            await asyncio.sleep(delay)
+
+
+async def abatch(
+    chain: Runnable, inputs: Sequence[dict[str, Any]], return_exceptions: bool = False
+) -> list[Any]:
+    """Invoke the chain for every input concurrently, the results are in the inputs order"""
+    semaphore = asyncio.Semaphore(settings.LLM_MAX_CONCURRENCY)
+    results = await asyncio.gather(
+        *(ainvoke(chain, input, semaphore) for input in inputs),
+        return_exceptions=return_exceptions,
+    )
+
+    for result in results:
+        if isinstance(result, BaseException):
+            logger.error(f"LLM call failed: {result!r}")
+    return results
+
+
+def run_concurrently(
+    chain: Runnable, inputs: Sequence[dict[str, Any]], return_exceptions: bool = False
+) -> list[Any]:
+    """
+    Same as ``abatch`` for the sync code (the views and the tasks), with ``return_exceptions``
+    the failed calls are returned as exceptions instead of failing all the others.
+    """
+    if not inputs:
+        return []
+    return async_to_sync(abatch)(chain, inputs, return_exceptions=return_exceptions)
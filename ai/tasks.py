@@ -1,11 +1,14 @@
+from collections import defaultdict
 from datetime import timedelta
 
 from django.conf import settings
 from django.utils import timezone
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import Runnable
 from langchain_openai import ChatOpenAI
 
+from ai.llm import run_concurrently
 from ai.models import AIGeneratedReport
 from celery import shared_task
 from client.models import ClientDetails
@@ -28,33 +31,62 @@ prompt_template = ChatPromptTemplate.from_messages(
 )
 
 
+def get_summary_chain() -> Runnable:
+    """
+    A summary chain with its own client, to be used within a single event loop: the async
+    client of a ``ChatOpenAI`` keeps its connections bound to the loop it was first used in
+    (and ``run_concurrently`` runs a new loop every time).
+    """
+    return prompt_template | ChatOpenAI(openai_api_key=settings.OPENAI_KEY) | StrOutputParser()
+
+
 @shared_task
-def summarize_client_reports():
+def summarize_client_reports() -> int:
     weeks_ago = timezone.now() - timedelta(weeks=8)
     now = timezone.now()
 
-    for client in ClientDetails.objects.filter(status="In Care").all():
-        client_reports = ProgressReport.objects.filter(client=client, created__gte=weeks_ago).all()
-
+    # The reports of all the "In Care" clients (in one query)
+    reports_per_client: dict[ClientDetails, list[ProgressReport]] = defaultdict(list)
+    for report in (
+        ProgressReport.objects.filter(client__status="In Care", created__gte=weeks_ago)
+        .select_related("client__user")
+        .order_by("client_id", "created")
+    ):
+        reports_per_client[report.client].append(report)
+
+    clients = list(reports_per_client)
+    inputs = []
+    for client in clients:
         client_info = (
             f"#Client info: id={client.pk}, full name: {client.first_name} {client.last_name}\n\n"
         )
 
         concatenated_reports: str = "# Client Reports:\n"
-        for report in client_reports:
+        for report in reports_per_client[client]:
             concatenated_reports += f"#Report ({report.pk}):\n#title: {report.title}\n#date: {report.date.date()}\n<content>{report.report_text}</content>\n\n---\n"
 
-        summary: str = ai_summarize.delay(client_info + concatenated_reports)
-        # Create a summary report
-        AIGeneratedReport.objects.create(
-            title=f"Generated client report ({client.pk}) from ({weeks_ago.date()} - {now.date()})",
-            content=summary,
-            user=client.user,
-            user_type=AIGeneratedReport.UserType.CLIENT,
-            report_type=AIGeneratedReport.ReportTypes.CLIENT_REPORTS_SUMMARY,
-            start_date=weeks_ago,
-            end_date=now,
-        )
+        inputs.append({"input": client_info + concatenated_reports})
+
+    # The clients are summarized concurrently (a failed summary doesn't fail the others)
+    summaries = run_concurrently(get_summary_chain(), inputs, return_exceptions=True)
+
+    # Create the summary reports
+    generated_reports = AIGeneratedReport.objects.bulk_create(
+        [
+            AIGeneratedReport(
+                title=f"Generated client report ({client.pk}) from ({weeks_ago.date()} - {now.date()})",
+                content=summary,
+                user=client.user,
+                user_type=AIGeneratedReport.UserType.CLIENT,
+                report_type=AIGeneratedReport.ReportTypes.CLIENT_REPORTS_SUMMARY,
+                start_date=weeks_ago,
+                end_date=now,
+            )
+            for client, summary in zip(clients, summaries)
+            if isinstance(summary, str)
+        ]
+    )
+    return len(generated_reports)
 
 
 @shared_task
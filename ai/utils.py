@@ -5,8 +5,11 @@ from typing import TYPE_CHECKING, Any, Literal
 from django.conf import settings
 from langchain_core.output_parsers import JsonOutputParser, StrOutputParser
 from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import Runnable
 from langchain_openai import ChatOpenAI
 
+from ai.llm import run_concurrently
+
 if TYPE_CHECKING:
     from employees.models import DomainObjective, ObjectiveHistory
 
@@ -106,15 +109,15 @@ def ai_summarize(content: str, default="no content") -> str:
     return chain.invoke({"input": content})
 
 
-def ai_smart_formula(
+def get_smart_formula_chain(
     domain: str,
-    goal: str,
     format: Literal["TEXT", "JSON"] = "TEXT",
     objective_number=3,
     language: str = "English",
     start_date: None | str = None,
     end_date: None | str = None,
-) -> str | dict[str, Any]:
+) -> tuple[Runnable, dict[str, Any]]:
+    """The chain and its input (without the goal) of the SMART formula objectives"""
     llm = ChatOpenAI(model=settings.OPENAI_MODEL, temperature=0, api_key=settings.OPENAI_KEY)
 
     prompt = ChatPromptTemplate.from_messages(
@@ -155,16 +158,49 @@ def ai_smart_formula(
         chain = prompt | llm | JsonOutputParser()
         format_string = format_string.format(format="JSON") + ":\n" + json_format
 
-    return chain.invoke(
-        {
-            "domain": domain,
-            "goal": goal,
-            "format": format,
-            "objective_number": objective_number,
-            "format_string": format_string,
-            "language_string": language,
-            "start_date": start_date,
-            "end_date": end_date,
-            "period_dates": period_dates,
-        }
+    return chain, {
+        "domain": domain,
+        "format": format,
+        "objective_number": objective_number,
+        "format_string": format_string,
+        "language_string": language_string.format(language=language),
+        "start_date": start_date,
+        "end_date": end_date,
+        "period_dates": period_dates,
+    }
+
+
+def ai_smart_formula(
+    domain: str,
+    goal: str,
+    format: Literal["TEXT", "JSON"] = "TEXT",
+    objective_number=3,
+    language: str = "English",
+    start_date: None | str = None,
+    end_date: None | str = None,
+) -> str | dict[str, Any]:
+    chain, input = get_smart_formula_chain(
+        domain, format, objective_number, language, start_date, end_date
+    )
+    return chain.invoke({**input, "goal": goal})
+
+
+def ai_smart_formulas(
+    domain: str,
+    goals: list[str],
+    format: Literal["TEXT", "JSON"] = "TEXT",
+    objective_number=3,
+    language: str = "English",
+    start_date: None | str = None,
+    end_date: None | str = None,
+) -> list[str | dict[str, Any] | BaseException]:
+    """
+    Same as ``ai_smart_formula`` for several goals, the calls are issued concurrently
+    (see: ai.llm), a failed goal is returned as its exception.
+    """
+    chain, input = get_smart_formula_chain(
+        domain, format, objective_number, language, start_date, end_date
+    )
+    return run_concurrently(
+        chain, [{**input, "goal": goal} for goal in goals], return_exceptions=True
     )
@@ -16,15 +16,19 @@ class Location(models.Model):
     capacity = models.IntegerField(null=True)
 
     def get_total_expenses(self) -> float:
-        return float(sum([expense.total_paid_amount() for expense in self.expenses.all()]))
+        from system.stats import get_expenses_total
+
+        total = self.expenses.aggregate(total=get_expenses_total())["total"]  # type: ignore
+        return float(total or 0)
 
     def get_total_revenue(self) -> float:
-        from client.models import Contract
+        """The total paid for the invoices of the location clients"""
+        from client.models import InvoiceHistory
 
-        self.client_location.values_list("id", flat=True).filter(
-            contracts__care_type=Contract.CareTypes.ACCOMMODATION
-        )
-        return 0
+        total = InvoiceHistory.objects.filter(invoice__client__location=self).aggregate(
+            total=models.Sum("amount")
+        )["total"]
+        return float(total or 0)
 
 
 class CustomUser(AbstractUser):
@@ -0,0 +1,84 @@
+"""
+Authenticated principals cache.
+
+The principal of a user (the user itself with its employee/client profile, and the effective
+permissions) is cached in Redis for ``PRINCIPAL_CACHE_TTL`` seconds, so authenticating a request
+(or a websocket) doesn't hit the database. It's invalidated (see: authentication.signals)
+when the user or its profile changes (e.g. deactivation, password change) and when
+the permissions change (the permissions version is part of the key).
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from authentication.models import CustomUser
+from employees.permissions import (
+    get_cache_timeout,
+    get_employee_permissions,
+    get_permissions_version,
+)
+
+CACHE_KEY_PREFIX = "principal"
+
+
+def get_principal_key(user_id: int) -> str:
+    return f"{CACHE_KEY_PREFIX}:{get_permissions_version()}:{user_id}"
+
+
+def load_principal(user_id: int) -> tuple[dict[str, Any] | None, int]:
+    """The principal of the user (or None) and how long it can be cached"""
+    now = timezone.now()
+    # The profiles are loaded (and cached) with the user
+    user = (
+        CustomUser.objects.select_related("profile", "Client_Profile").filter(id=user_id).first()
+    )
+    if user is None:
+        return None, 0
+
+    employee = getattr(user, "profile", None)
+    client = getattr(user, "Client_Profile", None)
+
+    permissions: set[str] = set()
+    next_change = None
+    if employee is not None:
+        effective_permissions = get_employee_permissions(employee.pk)
+        permissions = set(effective_permissions["permissions"].values())
+        next_change = effective_permissions["expires_at"]
+
+    principal = {
+        "user": user,
+        "employee_id": employee.pk if employee else None,
+        "client_id": client.pk if client else None,
+        "permissions": permissions,
+    }
+    return principal, get_cache_timeout(now, next_change, ttl=settings.PRINCIPAL_CACHE_TTL)
+
+
+def get_principal(user_id: int) -> dict[str, Any] | None:
+    key = get_principal_key(user_id)
+    principal = cache.get(key)
+    if principal is None:
+        principal, timeout = load_principal(user_id)
+        if principal is not None:
+            cache.set(key, principal, timeout=timeout)
+    return principal
+
+
+def get_authenticated_user(user_id: int) -> CustomUser | None:
+    """The (active) user of a validated token"""
+    principal = get_principal(user_id)
+    if principal is None or not principal["user"].is_active:
+        return None
+
+    user: CustomUser = principal["user"]
+    user.principal = principal  # type: ignore
+    return user
+
+
+def invalidate_principal(user_id: int) -> None:
+    cache.delete(get_principal_key(user_id))
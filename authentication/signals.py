@@ -0,0 +1,22 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from authentication.models import CustomUser
+from authentication.principals import invalidate_principal
+from client.models import ClientDetails
+from employees.models import EmployeeProfile
+
+
+# Refresh the cached principal (see: authentication.principals)
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def refresh_user_principal(sender, instance: CustomUser, **kwargs):
+    invalidate_principal(instance.pk)
+
+
+@receiver(post_save, sender=EmployeeProfile)
+@receiver(post_delete, sender=EmployeeProfile)
+@receiver(post_save, sender=ClientDetails)
+@receiver(post_delete, sender=ClientDetails)
+def refresh_profile_principal(sender, instance, **kwargs):
+    invalidate_principal(instance.user_id)
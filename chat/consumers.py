@@ -10,6 +10,7 @@ from django.core.cache import cache
 from rest_framework_simplejwt.tokens import AccessToken
 
 from authentication.models import CustomUser
+from authentication.principals import get_authenticated_user
 
 from .models import Conversation, Message
 
@@ -49,8 +50,8 @@ class WsConnection(AsyncWebsocketConsumer):
             user_id = payload.get("user_id")
             if not user_id:
                 return None
-            return CustomUser.objects.get(id=user_id)
-        except (jwt.ExpiredSignatureError, jwt.InvalidTokenError, CustomUser.DoesNotExist) as e:
+            return get_authenticated_user(user_id)
+        except (jwt.ExpiredSignatureError, jwt.InvalidTokenError) as e:
             return None
 
     async def disconnect(self, close_code):
@@ -161,3 +162,9 @@ class WsConnection(AsyncWebsocketConsumer):
                 }
             )
         )
+
+    # Handler for the new notifications (see: system.realtime)
+    async def notification(self, event):
+        await self.send(
+            text_data=json.dumps({"type": "notification", "notification": event["notification"]})
+        )
@@ -1,5 +1,6 @@
 from typing import Any
 
+from celery.result import AsyncResult
 from django.db import transaction
 from django.http import HttpRequest
 from django.shortcuts import get_object_or_404
@@ -90,6 +91,7 @@ from client.schemas import (
     ObjectiveHistorySchemaInput,
     ObjectiveHistorySchemaPatch,
     ObjectiveProgressReportSchema,
+    PDFJobSchema,
     RiskAssessmentInput,
     RiskAssessmentSchema,
     SelectedMaturityMatrixAssessmentInput,
@@ -97,6 +99,7 @@ from client.schemas import (
     YouthCareIntakeInput,
     YouthCareIntakeSchema,
 )
+from client.tasks import PDF_DOCUMENT_MODELS, queue_pdf_rendering
 from client.utils import get_employee
 from employees.models import (
     ClientMedication,
@@ -116,7 +119,7 @@ router = Router()
 @router.get("/contracts", response=list[ContractSchema])
 @paginate(NinjaCustomPagination)
 def contracts(request: HttpRequest, filter: ContractFilterSchema = Query(...)):  # type: ignore
-    return filter.filter(Contract.objects.all())
+    return filter.filter(Contract.objects.select_related("client", "sender"))
 
 
 @router.get("/contracts/{int:contract_id}", response=ContractSchema)
@@ -164,7 +167,7 @@ def delete_contract_working_hours(request: HttpRequest, id: int):
 @router.get("/{int:client_id}/contracts", response=list[ContractSchema])
 @paginate(NinjaCustomPagination)
 def client_contracts(request: HttpRequest, client_id: int):
-    return Contract.objects.filter(client__id=client_id).all()
+    return Contract.objects.filter(client__id=client_id).select_related("client", "sender")
 
 
 @router.post("/contracts/add", response=ContractSchema)
@@ -184,7 +187,9 @@ def update_client_contract(request: HttpRequest, id: int, contract: ContractSche
 @router.get("/invoices", response=list[InvoiceSchema])
 @paginate(NinjaCustomPagination)
 def all_invoices(request: HttpRequest, filter: InvoiceFilterSchema = Query(...)):  # type: ignore
-    return filter.filter(Invoice.objects.all())
+    return filter.filter(
+        Invoice.objects.select_related("client__sender").prefetch_related("history")
+    )
 
 
 @router.get("/invoices/{int:invoice_id}", response=InvoiceSchema)
@@ -192,11 +197,36 @@ def invoice_details(request: HttpRequest, invoice_id: int):
     return get_object_or_404(Invoice, id=invoice_id)
 
 
-@router.get("/invoices/{int:invoice_id}/download-link", response=DownloadLinkSchema)
-def invoice_download_as_pdf(request: HttpRequest, invoice_id: int):
-    """Download invoice as PDF"""
+@router.get(
+    "/invoices/{int:invoice_id}/download-link",
+    response={200: DownloadLinkSchema, 202: PDFJobSchema},
+)
+def invoice_download_as_pdf(request: HttpRequest, invoice_id: int, refresh: bool = False):
+    """
+    Download invoice as PDF.
+    Returns the link if the PDF is already rendered, otherwise a rendering job is queued (202)
+    and can be polled via "/pdf-jobs/{job_id}".
+    """
     invoice = get_object_or_404(Invoice, id=invoice_id)
-    return {"download_link": invoice.download_link()}
+    if invoice.pdf_attachment and not refresh:
+        return 200, {"download_link": invoice.pdf_attachment.file.url}
+
+    job_id = queue_pdf_rendering("invoice", invoice.pk, refresh=refresh)
+    return 202, {"job_id": job_id, "status": "PENDING"}
+
+
+@router.get("/pdf-jobs/{job_id}", response=PDFJobSchema)
+def pdf_job_status(request: HttpRequest, job_id: str):
+    """Poll a PDF rendering job (invoices and questionnaires)"""
+    result = AsyncResult(job_id)
+    job = {"job_id": job_id, "status": result.status}
+
+    if result.successful():
+        job["download_link"] = result.result
+    elif result.failed():
+        job["error"] = str(result.result)
+
+    return job
 
 
 @router.patch("/invoices/{int:invoice_id}/update", response=InvoiceSchema)
@@ -233,7 +263,11 @@ def delete_invoice_history_record(request: HttpRequest, record_id: int):
 @router.get("/{int:client_id}/invoices", response=list[InvoiceSchema])
 @paginate(NinjaCustomPagination)
 def client_invoices(request: HttpRequest, client_id: int):
-    return Invoice.objects.filter(client__id=client_id).all()
+    return (
+        Invoice.objects.filter(client__id=client_id)
+        .select_related("client__sender")
+        .prefetch_related("history")
+    )
 
 
 @router.get("/contracts/contract-types", response=list[ContractTypeSchema])
@@ -268,14 +302,14 @@ def delete_contract_type(request: HttpRequest, id: int):
 @paginate(NinjaCustomPagination)
 def medications(request: HttpRequest):
     """Return all the medication on the platform"""
-    return ClientMedication.objects.all()
+    return ClientMedication.objects.select_related("administered_by")
 
 
 @router.get("/{int:client_id}/medications", response=list[ClientMedicationSchema])
 @paginate(NinjaCustomPagination)
 def client_medications(request: HttpRequest, client_id: int):
     """Returns all the client's medications"""
-    return ClientMedication.objects.filter(client=client_id).all()
+    return ClientMedication.objects.filter(client=client_id).select_related("administered_by")
 
 
 @router.post("/medications/add", response={201: ClientMedicationSchema})
@@ -289,14 +323,14 @@ def add_client_medication(request: HttpRequest, medication: ClientMedicationSche
 
 
 @router.get("/medications/records", response=list[MedicationRecordSchema])
-@paginate(NinjaCustomPagination)
+@paginate(NinjaCustomPagination, ordering=("-created", "-id"), count_strategy="estimate")
 def all_medication_records(request: HttpRequest):
     """Return all the records on the platform"""
     return ClientMedicationRecord.objects.all()
 
 
 @router.get("/medications/{int:medication_id}/records", response=list[MedicationRecordSchema])
-@paginate(NinjaCustomPagination)
+@paginate(NinjaCustomPagination, count_strategy="cached")
 def medication_records(request: HttpRequest, medication_id: int):
     """Return all the records if a specific medication"""
     medication: ClientMedication = get_object_or_404(ClientMedication, id=medication_id)
@@ -307,7 +341,7 @@ def medication_records(request: HttpRequest, medication_id: int):
     "{int:client_id}/medications/records",
     response=list[MedicationRecordSchema],
 )
-@paginate(NinjaCustomPagination)
+@paginate(NinjaCustomPagination, count_strategy="cached")
 def client_medication_records(
     request: HttpRequest, client_id: int, filters: MedicationRecordFilterSchema = Query(...)  # type: ignore
 ):
@@ -357,13 +391,21 @@ def client_domains(request: HttpRequest, client_id: int):
 @router.get("/{int:client_id}/domains/{int:domain_id}/goals", response=list[DomainGoalSchema])
 @paginate(NinjaCustomPagination)
 def client_domain_goals(request: HttpRequest, client_id: int, domain_id: int):
-    return DomainGoal.objects.filter(client__id=client_id, domain__id=domain_id).all()
+    return (
+        DomainGoal.objects.filter(client__id=client_id, domain__id=domain_id)
+        .select_related("created_by", "reviewed_by")
+        .prefetch_related("objectives")
+    )
 
 
 @router.get("/{int:client_id}/goals", response=list[DomainGoalSchema])
 @paginate(NinjaCustomPagination)
 def client_goals(request: HttpRequest, client_id: int, filters: DomainGoalFilter = Query(...)):  # type: ignore
-    return filters.filter(DomainGoal.objects.filter(client__id=client_id)).all()
+    return filters.filter(
+        DomainGoal.objects.filter(client__id=client_id)
+        .select_related("created_by", "reviewed_by")
+        .prefetch_related("objectives")
+    )
 
 
 @router.post("/{int:client_id}/goals/add", response=DomainGoalSchema)
@@ -1119,20 +1161,15 @@ def get_selected_assessment_by_goal_id(request: HttpRequest, goal_id: int):
 
 
 @router.post(
-    "/questionnaires/generate-document-link", response=DocumentLinkSchema, tags=["questionnairs"]
+    "/questionnaires/generate-document-link",
+    response={200: DocumentLinkSchema, 202: PDFJobSchema},
+    tags=["questionnairs"],
 )
 def generate_questionnaire_link(request: HttpRequest, payload: DocumentLinkInput):
+    """Returns the document link if already rendered, otherwise queues a rendering job (202)"""
+    questionnaire = get_object_or_404(PDF_DOCUMENT_MODELS[payload.type], id=payload.id)
+    if questionnaire.pdf_attachment:
+        return 200, {"link": questionnaire.pdf_attachment.file.url}
 
-    link: str = ""
-
-    if payload.type == "collaboration_agreement":
-        questionnaire = get_object_or_404(CollaborationAgreement, id=payload.id)
-        link = questionnaire.download_link()
-    elif payload.type == "risk_assessment":
-        questionnaire = get_object_or_404(RiskAssessment, id=payload.id)
-        link = questionnaire.download_link()
-    elif payload.type == "consent_declaration":
-        questionnaire = get_object_or_404(ConsentDeclaration, id=payload.id)
-        link = questionnaire.download_link()
-
-    return {"link": link}
+    job_id = queue_pdf_rendering(payload.type, questionnaire.pk)
+    return 202, {"job_id": job_id, "status": "PENDING"}
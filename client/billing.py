@@ -0,0 +1,225 @@
+"""
+Set-based monthly billing engine.
+
+Loads every billable contract of the period and the aggregated working hours in a couple of
+grouped queries, computes the prices in one pass (mirroring the ``Contract.get_current_month_*``
+methods) and writes the invoices with a single ``bulk_create``.
+"""
+
+from __future__ import annotations
+
+import calendar
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Iterable
+
+from django.db import connection, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+from loguru import logger
+
+from system.stats import invalidate_dashboard_stats
+
+from .models import Contract, ContractWorkingHours, Invoice
+
+
+class QueryCounter:
+    """Counts the executed queries (to be used with ``connection.execute_wrapper``)."""
+
+    def __init__(self) -> None:
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def get_month_period(reference: datetime | None = None) -> tuple[datetime, datetime, int]:
+    """Return the (first day, last day, number of days) of the reference month."""
+    reference = reference or timezone.now()
+    _, number_of_days = calendar.monthrange(reference.year, reference.month)
+    month_start = reference.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    month_end = month_start.replace(day=number_of_days)
+    return month_start, month_end, number_of_days
+
+
+def get_monthly_price(contract: Contract, number_of_days: int) -> float:
+    """Same as ``Contract.get_monthly_price`` but for an explicit month length."""
+    if contract.price_frequency == Contract.Frequency.MONTHLY:
+        return float(contract.price)
+    if contract.price_frequency == Contract.Frequency.DAILY:
+        return float(contract.price * Decimal(number_of_days))
+    if contract.price_frequency == Contract.Frequency.HOURLY:
+        return float(contract.price * 24 * Decimal(number_of_days))
+    if contract.price_frequency == Contract.Frequency.MINUTE:
+        return float(contract.price * 60 * 24 * Decimal(number_of_days))
+    if contract.price_frequency == Contract.Frequency.WEEKLY:
+        return float(contract.price * Decimal(4.345))  # NOTE: 1 month = 4.345 weeks
+    return 0.0
+
+
+def get_contract_price(
+    contract: Contract,
+    month_start: datetime,
+    month_end: datetime,
+    number_of_days: int,
+    working_minutes: int,
+) -> float:
+    """The price (without tax) of a contract for the given month."""
+    if contract.care_type == Contract.CareTypes.ACCOMMODATION:
+        # Only the involved period of the month is billed
+        start_date = max(month_start, contract.start_date)
+        end_date = min(month_end, contract.end_date)
+        return (
+            (end_date - start_date).days
+            * get_monthly_price(contract, number_of_days)
+            / number_of_days
+        )
+
+    total_working_hours = Decimal(working_minutes) / 60
+    if contract.price_frequency == Contract.Frequency.HOURLY:
+        return float(contract.price * total_working_hours)
+    if contract.price_frequency == Contract.Frequency.MINUTE:
+        return float(contract.price * 60 * total_working_hours)
+    return 0.0
+
+
+def get_working_minutes(
+    contract_ids: Iterable[int], month_start: datetime, month_end: datetime
+) -> dict[int, int]:
+    """Total working minutes per contract within the month (clamped to the contract period)."""
+    rows = (
+        ContractWorkingHours.objects.filter(
+            contract_id__in=list(contract_ids),
+            datetime__gte=month_start,
+            datetime__lte=month_end,
+        )
+        .filter(
+            datetime__gte=F("contract__start_date"),
+            datetime__lte=F("contract__end_date"),
+        )
+        .order_by()
+        .values("contract_id")
+        .annotate(total_minutes=Sum("minutes"))
+    )
+    return {row["contract_id"]: row["total_minutes"] or 0 for row in rows}
+
+
+def generate_monthly_invoices(
+    client_ids: Iterable[int] | None = None,
+    send_notifications: bool = False,
+    reference: datetime | None = None,
+    prerender: bool = True,
+) -> dict:
+    """
+    Create the monthly invoices of the given clients (all the "In Care" clients by default).
+    This must be called once a month (to avoid invoice duplicates).
+
+    The invoices PDFs are pre-rendered by the "pdf" workers when ``prerender`` is set.
+
+    Returns a report of the run (counters, timing and the number of executed queries).
+    """
+    started = time.perf_counter()
+    now = reference or timezone.now()
+    month_start, month_end, number_of_days = get_month_period(now)
+    query_counter = QueryCounter()
+    invoices: list[Invoice] = []
+
+    with connection.execute_wrapper(query_counter):
+        # All the approved contracts of the billed clients within a valid contract period
+        contracts_query = Contract.objects.filter(
+            status=Contract.Status.APPROVED,
+            start_date__lte=now,
+            end_date__gte=now,
+        )
+        if client_ids is None:
+            contracts_query = contracts_query.filter(client__status="In Care")
+        else:
+            contracts_query = contracts_query.filter(client_id__in=list(client_ids))
+
+        contracts: list[Contract] = list(contracts_query.order_by("client_id", "id"))
+
+        working_minutes = get_working_minutes(
+            [
+                contract.pk
+                for contract in contracts
+                if contract.care_type != Contract.CareTypes.ACCOMMODATION
+            ],
+            month_start,
+            month_end,
+        )
+
+        contracts_per_client: dict[int, list[Contract]] = defaultdict(list)
+        for contract in contracts:
+            contracts_per_client[contract.client_id].append(contract)  # type: ignore
+
+        due_date = now + timedelta(days=30)
+        for client_id, client_contracts in contracts_per_client.items():
+            invoice_details = []
+            total_amount: float = 0
+
+            for contract in client_contracts:
+                used_tax = contract.used_tax()
+                contract_amount_without_tax = get_contract_price(
+                    contract,
+                    month_start,
+                    month_end,
+                    number_of_days,
+                    working_minutes.get(contract.pk, 0),
+                )
+                contract_amount = round(contract_amount_without_tax * (1 + used_tax / 100), 2)
+                total_amount += contract_amount
+
+                invoice_details.append(
+                    {
+                        "contract_id": contract.pk,
+                        "item_desc": f"Care: {contract.care_name} (contract: #{contract.pk}, {contract.financing_act}/{contract.financing_option})",
+                        "contract_amount": contract_amount,
+                        "contract_amount_without_tax": contract_amount_without_tax,
+                        "used_tax": used_tax,
+                    }
+                )
+
+            invoices.append(
+                Invoice(
+                    client_id=client_id,
+                    total_amount=Decimal(str(round(total_amount, 2))),
+                    invoice_details=invoice_details,
+                    due_date=due_date,
+                )
+            )
+
+        invoices = Invoice.objects.bulk_create(invoices)
+        invalidate_dashboard_stats("invoices")  # bulk_create doesn't send post_save
+
+        if send_notifications:
+            for invoice in Invoice.objects.filter(
+                id__in=[invoice.pk for invoice in invoices]
+            ).select_related("client__user"):
+                invoice.send_notification()
+
+    if prerender and invoices:
+        from celery import group
+        from client.tasks import render_pdf_document
+
+        # (once committed, when the invoices are created within a transaction, e.g. a batch job)
+        transaction.on_commit(
+            group(render_pdf_document.s("invoice", invoice.pk) for invoice in invoices).apply_async
+        )
+
+    report = {
+        "period": month_start.strftime("%m/%Y"),
+        "clients": len(contracts_per_client),
+        "contracts": len(contracts),
+        "invoices_created": len(invoices),
+        "invoice_ids": [invoice.pk for invoice in invoices],
+        "queries": query_counter.count,
+        "duration": round(time.perf_counter() - started, 3),
+    }
+    logger.info(
+        f"Monthly invoices ({report['period']}): {report['invoices_created']} invoices for "
+        f"{report['contracts']} contracts in {report['duration']}s ({report['queries']} queries)"
+    )
+    return report
@@ -0,0 +1,37 @@
+"""Batch functions of the client schemas dataloaders (see: system.loaders)"""
+
+from django.db.models import Count, Sum
+
+from employees.models import ClientMedicationRecord
+from system.models import AttachmentFile
+
+from .models import InvoiceHistory
+
+
+def load_attachments(ids: list[str]) -> dict[str, AttachmentFile]:
+    return {
+        str(attachment.pk): attachment for attachment in AttachmentFile.objects.filter(id__in=ids)
+    }
+
+
+def load_invoices_total_paid_amount(invoice_ids: list[int]) -> dict[int, float]:
+    totals = (
+        InvoiceHistory.objects.filter(invoice_id__in=invoice_ids)
+        .order_by()
+        .values("invoice_id")
+        .annotate(total=Sum("amount"))
+    )
+    return {row["invoice_id"]: float(row["total"] or 0) for row in totals}
+
+
+def load_medications_unset_records(medication_ids: list[int]) -> dict[int, int]:
+    totals = (
+        ClientMedicationRecord.objects.filter(
+            client_medication_id__in=medication_ids,
+            status=ClientMedicationRecord.Status.AWAITING,
+        )
+        .order_by()
+        .values("client_medication_id")
+        .annotate(total=Count("id"))
+    )
+    return {row["client_medication_id"]: row["total"] for row in totals}
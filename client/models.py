@@ -8,20 +8,19 @@ from decimal import Decimal
 from typing import TYPE_CHECKING
 
 from django.conf import settings
-from django.core.files.base import ContentFile
 from django.db import models
 from django.db.models import Sum
 from django.shortcuts import get_object_or_404
 from django.template.loader import render_to_string
 from django.utils import timezone
 from loguru import logger
-from weasyprint import HTML
 
 from ai.utils import ai_summarize
 from assessments.models import Assessment, AssessmentDomain
 from authentication.models import Location
+from system.mail import queue_mail
 from system.models import AttachmentFile, DBSettings, Notification, ProtectedEmail
-from system.utils import send_mail_async
+from system.pdf import render_pdf_attachment
 
 if TYPE_CHECKING:
     from employees.models import ProgressReport
@@ -128,52 +127,13 @@ class ClientDetails(models.Model):
 
     def generate_the_monthly_invoice(self, send_notifications=False) -> Invoice | None:
         """This function mush be called on once a month (to avoid invoice duplicate)."""
-        # Get all client approved contracts
-        current_date = timezone.now().date()
-        contracts: list[Contract] = list(
-            Contract.objects.filter(
-                status=Contract.Status.APPROVED,
-                start_date__lte=current_date,
-                end_date__gte=current_date,
-            ).all()
-        )
-
-        invoice_details = []
-        total_amount: float = 0
-
-        for contract in contracts:
-            contract_amount: float = 0  # the contract amount for this month
-
-            contract_amount_without_tax: float = contract.get_current_month_price(apply_tax=False)
-            contract_amount = round(
-                contract_amount_without_tax * (1 + contract.used_tax() / 100), 2
-            )
-            total_amount += contract_amount
-
-            invoice_details.append(
-                {
-                    "contract_id": contract.pk,
-                    "item_desc": f"Care: {contract.care_name} (contract: #{contract.id}, {contract.financing_act}/{contract.financing_option})",
-                    "contract_amount": contract_amount,
-                    "contract_amount_without_tax": contract_amount_without_tax,
-                    "used_tax": contract.used_tax(),
-                }
-            )
-
-        if invoice_details:
-            # Create invoice for each all the available contracts
-            invoice = Invoice.objects.create(
-                client=self,
-                total_amount=Decimal(total_amount),
-                invoice_details=invoice_details,
-                due_date=timezone.now() + timedelta(days=30),
-            )
-
-            # Send notifications
-            if send_notifications:
-                invoice.send_notification()
+        from client.billing import generate_monthly_invoices
 
-            return invoice
+        report = generate_monthly_invoices(
+            client_ids=[self.pk], send_notifications=send_notifications
+        )
+        if report["invoice_ids"]:
+            return Invoice.objects.get(id=report["invoice_ids"][0])
         return None
 
     def has_untaken_medications(self) -> int:
@@ -381,7 +341,7 @@ class ClientEmergencyContact(models.Model):
         self.uuid = uuid.uuid4()
         self.save()
 
-        send_mail_async(
+        queue_mail(
             from_email=settings.DEFAULT_FROM_EMAIL,
             subject="Email Verification",
             recipient_list=[self.email],
@@ -623,7 +583,7 @@ class Contract(models.Model):
         return price
 
     def get_current_month_price(self, apply_tax=True) -> float:
-        if self.type == Contract.CareTypes.ACCOMMODATION:
+        if self.care_type == Contract.CareTypes.ACCOMMODATION:
             return self.get_current_month_price_via_period(apply_tax=apply_tax)
 
         return self.get_current_month_price_via_working_hours(apply_tax=apply_tax)
@@ -749,22 +709,10 @@ class Invoice(models.Model):
             if self.pdf_attachment:
                 self.pdf_attachment.delete()
 
-    def download_link(self, refresh=False) -> str:
-        """Ensure to generate an invoice PDF and return a link to download it"""
-        """
-        this is the structure of "self.invoice_details"
-        {
-            "contract_id": str,
-            "item_desc": str,
-            "contract_amount": float,
-            "contract_amount_without_tax": float,
-            "used_tax": int,
-        }
-        """
-        # check if the PDF is already generated
-        if self.pdf_attachment and refresh is False:
-            return self.pdf_attachment.file.url
+    pdf_template_name = "invoice_template.html"
 
+    def get_pdf_context(self) -> dict:
+        """The context of the PDF template"""
         sender = self.client.sender
         company_name: str = DBSettings.get("CONTACT_COMPANY_NAME", DBSettings.get("SITE_NAME"))
         prefix_content: str = (
@@ -803,26 +751,35 @@ class Invoice(models.Model):
             "invoice_address": DBSettings.get("CONTACT_ADDRESS"),
             "invoice_phone": DBSettings.get("CONTACT_PHONE"),
         }
-        html_string = render_to_string("invoice_template.html", context)
-        html = HTML(string=html_string)
-        pdf_content = html.write_pdf()
-        new_attachment = AttachmentFile()
-        new_attachment.name = f"Invoice_{self.invoice_number}.pdf"
-        new_attachment.file.save(
-            new_attachment.name, ContentFile(pdf_content if pdf_content else "")
-        )
-        new_attachment.size = new_attachment.file.size
-        new_attachment.is_used = True
-        new_attachment.tag = "Invoice"
-        new_attachment.save()
 
-        # Assign the generated PDF.
-        if self.pdf_attachment:
-            self.pdf_attachment.delete()  # Delete the old one in case of refresh is True
+        return context
+
+    def download_link(self, refresh=False) -> str:
+        """Ensure to generate an invoice PDF and return a link to download it"""
+        """
+        this is the structure of "self.invoice_details"
+        {
+            "contract_id": str,
+            "item_desc": str,
+            "contract_amount": float,
+            "contract_amount_without_tax": float,
+            "used_tax": int,
+        }
+        """
+        # check if the PDF is already generated
+        if self.pdf_attachment and refresh is False:
+            return self.pdf_attachment.file.url
 
-        self.pdf_attachment = new_attachment
+        # Reuses the current PDF if nothing changed (see: system.pdf)
+        self.pdf_attachment = render_pdf_attachment(
+            self.pdf_template_name,
+            self.get_pdf_context(),
+            name=f"Invoice_{self.invoice_number}.pdf",
+            tag="Invoice",
+            current=self.pdf_attachment,
+        )
 
-        return new_attachment.file.url
+        return self.pdf_attachment.file.url
 
 
 class InvoiceHistory(models.Model):
@@ -1296,13 +1253,10 @@ class CollaborationAgreement(models.Model):
     updated = models.DateTimeField(auto_now=True)
     created = models.DateTimeField(auto_now_add=True)
 
-    def download_link(self, refresh=False) -> str:
-        """return a link of the collaboration agreement PDF"""
-
-        # check if the PDF is already generated
-        if self.pdf_attachment and refresh is False:
-            return self.pdf_attachment.file.url
+    pdf_template_name = "questionnaire/collaboration_agreement.html"
 
+    def get_pdf_context(self) -> dict:
+        """The context of the PDF template"""
         context = {
             # Client
             "client_full_name": self.client_full_name,
@@ -1324,26 +1278,25 @@ class CollaborationAgreement(models.Model):
             "attention_risks": self.attention_risks,
         }
 
-        html_string = render_to_string("questionnaire/collaboration_agreement.html", context)
-        html = HTML(string=html_string)
-        pdf_content = html.write_pdf()
-        new_attachment = AttachmentFile()
-        new_attachment.name = f"Collaboration_Agreement_{self.client_full_name}_{self.probation_full_name}_{self.healthcare_institution_name}.pdf"
-        new_attachment.file.save(
-            new_attachment.name, ContentFile(pdf_content if pdf_content else "")
-        )
-        new_attachment.size = new_attachment.file.size
-        new_attachment.is_used = True
-        new_attachment.tag = "Collaboration_Agreement"
-        new_attachment.save()
+        return context
 
-        # Assign the generated PDF.
-        if self.pdf_attachment:
-            self.pdf_attachment.delete()  # Delete the old one in case of refresh is True
+    def download_link(self, refresh=False) -> str:
+        """return a link of the collaboration agreement PDF"""
 
-        self.pdf_attachment = new_attachment
+        # check if the PDF is already generated
+        if self.pdf_attachment and refresh is False:
+            return self.pdf_attachment.file.url
+
+        # Reuses the current PDF if nothing changed (see: system.pdf)
+        self.pdf_attachment = render_pdf_attachment(
+            self.pdf_template_name,
+            self.get_pdf_context(),
+            name=f"Collaboration_Agreement_{self.client_full_name}_{self.probation_full_name}_{self.healthcare_institution_name}.pdf",
+            tag="Collaboration_Agreement",
+            current=self.pdf_attachment,
+        )
 
-        return new_attachment.file.url
+        return self.pdf_attachment.file.url
 
 
 class RiskAssessment(models.Model):
@@ -1409,13 +1362,10 @@ class RiskAssessment(models.Model):
     class Meta:
         ordering = ("-created",)
 
-    def download_link(self, refresh=False) -> str:
-        """return a link of the risk assessment PDF"""
-
-        # check if the PDF is already generated
-        if self.pdf_attachment and refresh is False:
-            return self.pdf_attachment.file.url
+    pdf_template_name = "questionnaire/risk_assessment.html"
 
+    def get_pdf_context(self) -> dict:
+        """The context of the PDF template"""
         context = {
             # Client
             "youth_name": f"{self.client.first_name} {self.client.last_name}",
@@ -1460,28 +1410,25 @@ class RiskAssessment(models.Model):
             "time_table": self.time_table,
         }
 
-        html_string = render_to_string("questionnaire/risk_assessment.html", context)
-        html = HTML(string=html_string)
-        pdf_content = html.write_pdf()
-        new_attachment = AttachmentFile()
-        new_attachment.name = (
-            f"Risk_Assessment{self.client.first_name}_{self.client.last_name}.pdf"
-        )
-        new_attachment.file.save(
-            new_attachment.name, ContentFile(pdf_content if pdf_content else "")
-        )
-        new_attachment.size = new_attachment.file.size
-        new_attachment.is_used = True
-        new_attachment.tag = "Risk_Assessment"
-        new_attachment.save()
+        return context
 
-        # Assign the generated PDF.
-        if self.pdf_attachment:
-            self.pdf_attachment.delete()  # Delete the old one in case of refresh is True
+    def download_link(self, refresh=False) -> str:
+        """return a link of the risk assessment PDF"""
 
-        self.pdf_attachment = new_attachment
+        # check if the PDF is already generated
+        if self.pdf_attachment and refresh is False:
+            return self.pdf_attachment.file.url
 
-        return new_attachment.file.url
+        # Reuses the current PDF if nothing changed (see: system.pdf)
+        self.pdf_attachment = render_pdf_attachment(
+            self.pdf_template_name,
+            self.get_pdf_context(),
+            name=f"Risk_Assessment{self.client.first_name}_{self.client.last_name}.pdf",
+            tag="Risk_Assessment",
+            current=self.pdf_attachment,
+        )
+
+        return self.pdf_attachment.file.url
 
 
 class ConsentDeclaration(models.Model):
@@ -1521,13 +1468,10 @@ class ConsentDeclaration(models.Model):
     def __str__(self):
         return f"{self.youth_name} - {self.youth_care_institution}"
 
-    def download_link(self, refresh=False) -> str:
-        """return a link of the consent declaration PDF"""
-
-        # check if the PDF is already generated
-        if self.pdf_attachment and refresh is False:
-            return self.pdf_attachment.file.url
+    pdf_template_name = "questionnaire/declaration_of_consent.html"
 
+    def get_pdf_context(self) -> dict:
+        """The context of the PDF template"""
         context = {
             # Client
             "youth_name": self.youth_name,
@@ -1547,28 +1491,25 @@ class ConsentDeclaration(models.Model):
             "contact_email": self.contact_email,
         }
 
-        html_string = render_to_string("questionnaire/declaration_of_consent.html", context)
-        html = HTML(string=html_string)
-        pdf_content = html.write_pdf()
-        new_attachment = AttachmentFile()
-        new_attachment.name = (
-            f"Consent_declaration{self.client.first_name}_{self.client.last_name}.pdf"
-        )
-        new_attachment.file.save(
-            new_attachment.name, ContentFile(pdf_content if pdf_content else "")
-        )
-        new_attachment.size = new_attachment.file.size
-        new_attachment.is_used = True
-        new_attachment.tag = "Consent_Declaration"
-        new_attachment.save()
+        return context
 
-        # Assign the generated PDF.
-        if self.pdf_attachment:
-            self.pdf_attachment.delete()  # Delete the old one in case of refresh is True
+    def download_link(self, refresh=False) -> str:
+        """return a link of the consent declaration PDF"""
 
-        self.pdf_attachment = new_attachment
+        # check if the PDF is already generated
+        if self.pdf_attachment and refresh is False:
+            return self.pdf_attachment.file.url
+
+        # Reuses the current PDF if nothing changed (see: system.pdf)
+        self.pdf_attachment = render_pdf_attachment(
+            self.pdf_template_name,
+            self.get_pdf_context(),
+            name=f"Consent_declaration{self.client.first_name}_{self.client.last_name}.pdf",
+            tag="Consent_Declaration",
+            current=self.pdf_attachment,
+        )
 
-        return new_attachment.file.url
+        return self.pdf_attachment.file.url
 
 
 class YouthCareIntake(models.Model):
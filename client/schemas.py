@@ -4,6 +4,11 @@ from typing import Any, Literal, Optional
 from loguru import logger
 from ninja import Field, FilterSchema, ModelSchema, Schema
 
+from client.loaders import (
+    load_attachments,
+    load_invoices_total_paid_amount,
+    load_medications_unset_records,
+)
 from client.models import (
     ClientCurrentLevel,
     ClientDetails,
@@ -33,7 +38,7 @@ from employees.models import (
     ObjectiveHistory,
     ObjectiveProgressReport,
 )
-from system.models import AttachmentFile
+from system.loaders import get_loader
 from system.schemas import AttachmentFileSchema
 
 
@@ -69,14 +74,23 @@ class ContractSchema(ModelSchema):
         return contract.client.email
 
     @staticmethod
-    def resolve_attachments(contract: Contract) -> list[AttachmentFileSchema]:
+    def resolve_attachments(contract: Contract, context) -> list[AttachmentFileSchema]:
         files: list[AttachmentFileSchema] = []
+        # Loaded at once for all the contracts of the page
+        loader = get_loader(
+            context,
+            "contracts_attachments",
+            load_attachments,
+            model=Contract,
+            keys=lambda contract: map(str, contract.attachment_ids),
+        )
 
         for uuid in contract.attachment_ids:
-            try:
-                files.append(AttachmentFileSchema.from_orm(AttachmentFile.objects.get(id=uuid)))
-            except AttachmentFile.DoesNotExist:
+            attachment = loader.load(str(uuid))
+            if attachment is None:
                 logger.error(f"AttachmentFile not found: {uuid}")
+                continue
+            files.append(AttachmentFileSchema.from_orm(attachment))
 
         return files
 
@@ -132,8 +146,16 @@ class InvoiceSchema(ModelSchema):
         exclude = ("client",)
 
     @staticmethod
-    def resolve_total_paid_amount(invoice: Invoice) -> float:
-        return invoice.total_paid_amount()
+    def resolve_total_paid_amount(invoice: Invoice, context) -> float:
+        loader = get_loader(
+            context,
+            "invoices_total_paid_amount",
+            load_invoices_total_paid_amount,
+            model=Invoice,
+            keys=lambda invoice: [invoice.pk],
+            default=0,
+        )
+        return loader.load(invoice.pk)
 
     @staticmethod
     def resolve_sender_name(invoice: Invoice) -> str:
@@ -177,6 +199,13 @@ class DownloadLinkSchema(Schema):
     download_link: str
 
 
+class PDFJobSchema(Schema):
+    job_id: str
+    status: str  # PENDING | STARTED | SUCCESS | FAILURE | RETRY | REVOKED
+    download_link: str | None = None
+    error: str | None = None
+
+
 class ContractTypeSchema(ModelSchema):
     class Meta:
         model = ContractType
@@ -205,12 +234,16 @@ class ClientMedicationSchema(ModelSchema):
         exclude = ("client", "administered_by", "updated")
 
     @staticmethod
-    def resolve_unset_medications(medication: ClientMedication) -> int:
-        return int(
-            medication.records.filter(  # type: ignore
-                status=ClientMedicationRecord.Status.AWAITING
-            ).count()
+    def resolve_unset_medications(medication: ClientMedication, context) -> int:
+        loader = get_loader(
+            context,
+            "medications_unset_records",
+            load_medications_unset_records,
+            model=ClientMedication,
+            keys=lambda medication: [medication.pk],
+            default=0,
         )
+        return loader.load(medication.pk)
 
     @staticmethod
     def resolve_administered_by_name(medication: ClientMedication) -> str:
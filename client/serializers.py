@@ -12,6 +12,23 @@ from system.serializers import AttchementFileSerialize
 from .models import *
 
 
+class ClientDetailsListSerializer(serializers.ListSerializer):
+    """Loads the identity attachments of all the listed clients at once"""
+
+    def to_representation(self, data):
+        clients: list[ClientDetails] = list(data.all() if hasattr(data, "all") else data)
+
+        attachment_ids = {
+            attachment_id for client in clients for attachment_id in client.identity_attachment_ids
+        }
+        self.context["identity_attachments"] = {
+            str(attachment.pk): attachment
+            for attachment in AttachmentFile.objects.filter(id__in=attachment_ids, is_used=True)
+        }
+
+        return super().to_representation(clients)
+
+
 class ClientDetailsSerializer(serializers.ModelSerializer):
     location = serializers.SerializerMethodField()
     attachments = serializers.SerializerMethodField()
@@ -57,6 +74,7 @@ class ClientDetailsSerializer(serializers.ModelSerializer):
             "profile_picture": {"required": False},
             "gps_position": {"read_only": True},
         }
+        list_serializer_class = ClientDetailsListSerializer
 
     def get_location(self, obj):
         if obj.location:
@@ -65,12 +83,29 @@ class ClientDetailsSerializer(serializers.ModelSerializer):
 
     def to_representation(self, instance: ClientDetails):
         representation = super().to_representation(instance)
-        representation["has_untaken_medications"] = instance.has_untaken_medications()
+        if hasattr(instance, "untaken_medications"):
+            # Annotated (see: ClientListView.get_queryset)
+            representation["has_untaken_medications"] = instance.untaken_medications
+        else:
+            representation["has_untaken_medications"] = instance.has_untaken_medications()
         return representation
 
     def get_attachments(self, obj: ClientDetails):
         attachment_ids = obj.identity_attachment_ids
-        attachments = AttachmentFile.objects.filter(id__in=attachment_ids, is_used=True)
+        if "identity_attachments" in self.context:
+            # Already loaded by ClientDetailsListSerializer
+            identity_attachments = self.context["identity_attachments"]
+            attachments = sorted(
+                (
+                    identity_attachments[str(attachment_id)]
+                    for attachment_id in attachment_ids
+                    if str(attachment_id) in identity_attachments
+                ),
+                key=lambda attachment: attachment.created,
+                reverse=True,
+            )
+        else:
+            attachments = AttachmentFile.objects.filter(id__in=attachment_ids, is_used=True)
         return AttchementFileSerialize(attachments, many=True).data
 
     def get_document_info(self, obj: ClientDetails):
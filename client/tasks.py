@@ -1,11 +1,15 @@
 import calendar
 import datetime
 import logging
+from collections import defaultdict
 from decimal import Decimal
+from functools import partial
 
 from django.conf import settings
 from django.core.files.base import ContentFile
 from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Avg, QuerySet
 from django.template.loader import render_to_string
 from django.utils import timezone
 from loguru import logger
@@ -17,15 +21,34 @@ from celery import shared_task
 from employees.models import (
     ClientMedication,
     ClientMedicationRecord,
+    ClientMedicationSlot,
     DomainGoal,
     GoalHistory,
-    ObjectiveHistory,
     ProgressReport,
 )
+from system.batch import batch_job, start_batch_job
+from system.mail import queue_mail
 from system.models import AttachmentFile, Notification
 from system.utils import send_mail_async
 
-from .models import ClientDetails, ClientEmergencyContact, Contract, Invoice
+from .billing import generate_monthly_invoices
+from .models import (
+    ClientDetails,
+    ClientEmergencyContact,
+    CollaborationAgreement,
+    ConsentDeclaration,
+    Contract,
+    Invoice,
+    RiskAssessment,
+)
+
+# Documents that can be rendered as PDF (see: "render_pdf_document")
+PDF_DOCUMENT_MODELS = {
+    "invoice": Invoice,
+    "collaboration_agreement": CollaborationAgreement,
+    "risk_assessment": RiskAssessment,
+    "consent_declaration": ConsentDeclaration,
+}
 
 
 @shared_task
@@ -59,14 +82,43 @@ def send_progress_report_email(progress_report_id, report_text):
         pass
 
 
+@shared_task
+def render_pdf_document(document_type: str, document_id: int, refresh: bool = False) -> str:
+    """Render the PDF of a document (routed to the "pdf" queue) and return its download link."""
+    model = PDF_DOCUMENT_MODELS[document_type]
+    document = model.objects.get(id=document_id)
+
+    download_link: str = document.download_link(refresh=refresh)
+    document.save(update_fields=["pdf_attachment"])
+
+    return download_link
+
+
+def queue_pdf_rendering(document_type: str, document_id: int, refresh: bool = False) -> str:
+    """Queue a PDF rendering job and return its job id."""
+    return render_pdf_document.delay(document_type, document_id, refresh=refresh).id
+
+
+@batch_job(
+    "monthly_invoices", queryset=lambda params: ClientDetails.objects.filter(status="In Care")
+)
+def bill_clients(clients: QuerySet[ClientDetails], params: dict) -> dict[str, int]:
+    report = generate_monthly_invoices(
+        client_ids=clients.values_list("pk", flat=True),
+        reference=datetime.datetime.fromisoformat(params["reference"]),
+    )
+    return {key: report[key] for key in ("clients", "contracts", "invoices_created", "queries")}
+
+
 @shared_task
 def invoice_creation_per_month():
     logger.debug("task: Create monthly invoices!")
-    # Get all the current approved clients with a valid contract period
-    clients = ClientDetails.objects.filter(status="In Care").all()
-
-    for client in clients:
-        invoice = client.generate_the_monthly_invoice()
+    # Bill all the "In Care" clients by chunks, the run of the month is resumed (not billed twice)
+    now = timezone.now()
+    job = start_batch_job(
+        "monthly_invoices", run_key=now.strftime("%Y-%m"), params={"reference": now.isoformat()}
+    )
+    return job.pk
 
 
 # @shared_task
@@ -192,7 +244,9 @@ def invoice_mark_as_expired():
     # Get all "outstanding" invoices more than 1 month
     # one_month_datetime = timezone.now() - datetime.timedelta(days=30)
     invoices: list[Invoice] = list(
-        Invoice.objects.filter(status="outstanding", due_date__lt=timezone.now()).all()
+        Invoice.objects.filter(status="outstanding", due_date__lt=timezone.now()).select_related(
+            "client__user"
+        )
     )
 
     # make it as "expired"
@@ -201,17 +255,19 @@ def invoice_mark_as_expired():
         invoice.save()
 
     # send an email notification if needed to the invoice owner
-    for invoice in invoices:
-        if invoice.client.email:
-            notification = Notification.objects.create(
+    Notification.bulk_notify(
+        [
+            Notification(
                 title="Invoice expired",
                 event=Notification.EVENTS.INVOICE_EXPIRED,
                 content=f"The invoice #{invoice.id} expired.",
-                receiver=invoice.client.email,
+                receiver=invoice.client.user,
                 metadata={"invoice_id": invoice.id},
             )
-
-            notification.notify()
+            for invoice in invoices
+            if invoice.client.email
+        ]
+    )
 
 
 @shared_task
@@ -219,21 +275,25 @@ def invoice_send_notification_3_months_before():
     # Get all "outstanding" invoices more than 1 month
     three_months_before = timezone.now() - datetime.timedelta(days=30)
     invoices: list[Invoice] = list(
-        Invoice.objects.filter(status="outstanding", due_date__gt=three_months_before).all()
+        Invoice.objects.filter(
+            status="outstanding", due_date__gt=three_months_before
+        ).select_related("client__user")
     )
 
     # send an email notification if needed to the invoice owner
-    for invoice in invoices:
-        if invoice.client.email:
-            notification = Notification.objects.create(
+    Notification.bulk_notify(
+        [
+            Notification(
                 title="Invoice notification",
                 event=Notification.EVENTS.INVOICE_EXPIRED,
                 content=f"You have an invoice to pay (#{invoice.pk}).",
                 receiver=invoice.client.user,
                 metadata={"invoice_id": invoice.pk},
             )
-
-            notification.notify()
+            for invoice in invoices
+            if invoice.client.email
+        ]
+    )
 
 
 @shared_task
@@ -243,58 +303,76 @@ def create_and_send_medication_record_notification():
         minutes=settings.MEDICATION_RECORDS_CREATATION
     )  # one hour ahead (and it should be the task interval)
 
-    medications = ClientMedication.objects.filter(
-        start_date__lte=current_date.date(), end_date__gte=current_date.date()
-    ).all()
-
-    created_medication_records: list[ClientMedicationRecord] = []
-
-    # Create Medication Records when they get close (in time)
-    for medication in medications:
-        for slot in medication.get_available_slots():
-            if current_date <= slot <= ahead_datetime:
-                logger.debug(
-                    f"{current_date} <= {slot} <= {ahead_datetime}: {(current_date <= slot <= ahead_datetime)}"
-                )
-                # Create a Medication record
-                medication_record = ClientMedicationRecord.objects.create(
-                    client_medication=medication,
-                    time=slot,
-                )
-                logger.debug(f"Task: Medical Record Created #{medication_record.id}")
-                created_medication_records.append(medication_record)
-
-    # Send notifications
-    for medication_record in created_medication_records:
-        medication_record.notify()
-
+    # The dose times within the window of the active medications (one indexed range query)
+    upcoming_slots = ClientMedicationSlot.objects.filter(
+        time__gte=current_date,
+        time__lte=ahead_datetime,
+        client_medication__start_date__lte=current_date.date(),
+        client_medication__end_date__gte=current_date.date(),
+    ).values_list("client_medication_id", "time")
+
+    # Create Medication Records when they get close (in time),
+    # the records created by an overlapping run (or a previous window) are skipped
+    created_medication_records = ClientMedicationRecord.bulk_create_due(list(upcoming_slots))
+    logger.debug(f"Task: {len(created_medication_records)} Medical Records Created")
+
+    # Send notifications (all at once)
+    Notification.bulk_notify(
+        [
+            notification
+            for medication_record in created_medication_records
+            for notification in medication_record.get_notifications()
+        ]
+    )
 
-@shared_task
-def send_contract_reminders():
-    logger.debug("Task: Sending contract reminders.")
-    current_datetime = timezone.now()
 
-    all_contracts = Contract.objects.filter(status=Contract.Status.APPROVED).all()
+@batch_job(
+    "contract_reminders",
+    queryset=lambda params: Contract.objects.filter(status=Contract.Status.APPROVED),
+)
+def remind_contracts(contracts: QuerySet[Contract], params: dict) -> dict[str, int]:
+    current_datetime = datetime.datetime.fromisoformat(params["reference"])
     available_contracts: list[Contract] = []
 
     # select the contracts that are going to expire
-    for contract in all_contracts:
+    for contract in contracts.select_related("sender"):
         date = (current_datetime + datetime.timedelta(days=contract.reminder_period)).date()
 
         if date == contract.end_date.date():
             available_contracts.append(contract)
 
     # Send notification reminder
-    for contract in available_contracts:
-        if contract.sender and contract.sender.email_adress:
-            notification = Notification.objects.create(
+    reminded_contracts = [
+        contract
+        for contract in available_contracts
+        if contract.sender and contract.sender.email_adress
+    ]
+    Notification.bulk_notify(
+        [
+            Notification(
                 title="Contract reminder",
                 event=Notification.EVENTS.CONTRACT_REMINDER,
                 content=f"The contract #{contract.pk} is about to expire, make sure to renew it if needed.",
                 metadata={"contract_id": contract.pk},
             )
+            for contract in reminded_contracts
+        ],
+        to=[contract.sender.email_adress for contract in reminded_contracts],
+    )
+    return {"reminders_sent": len(reminded_contracts)}
 
-            notification.notify(to=contract.sender.email_adress)
+
+@shared_task
+def send_contract_reminders():
+    logger.debug("Task: Sending contract reminders.")
+    current_datetime = timezone.now()
+    # One run per day (by chunks of contracts)
+    job = start_batch_job(
+        "contract_reminders",
+        run_key=current_datetime.date().isoformat(),
+        params={"reference": current_datetime.isoformat()},
+    )
+    return job.pk
 
 
 @shared_task
@@ -318,20 +396,45 @@ def delete_unused_attachments():
 
 
 @shared_task
-def record_goals_and_objectives_history():
+def record_goals_and_objectives_history() -> int:
     logger.debug("Task: record goals and objectives history.")
     # this function needs to be dispatched once everyday.
-    now = timezone.now()
-    for goal in DomainGoal.objects.all():
-        # check if the current date has a record or not, if not then create one
-        if not GoalHistory.objects.filter(date=now.date(), goal=goal).exists():
-            GoalHistory.objects.create(rating=goal.main_goal_rating(), goal=goal)
-            for objective in goal.objectives.all():  # type: ignore
-                ObjectiveHistory.objects.create(rating=objective.rating, objective=objective)
+    # The ratings of all the goals (the average of their objectives, see: DomainGoal.main_goal_rating)
+    # The goals that already have a record for the current date are skipped
+    # (the same date as GoalHistory.date, i.e. auto_now_add)
+    goals_ratings = (
+        DomainGoal.objects.exclude(history__date=datetime.date.today())
+        .order_by()
+        .annotate(average_rating=Avg("objectives__rating"))
+    )
+
+    # (the records created meanwhile by a concurrent run are ignored)
+    snapshots = GoalHistory.objects.bulk_create(
+        [
+            GoalHistory(goal_id=goal_id, rating=round(average_rating or 0, 1))
+            for goal_id, average_rating in goals_ratings.values_list("id", "average_rating")
+        ],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+    logger.debug(f"Task: {len(snapshots)} goals history snapshotted.")
+    return len(snapshots)
+
+
+def get_medication_report_clients(params: dict) -> QuerySet[ClientDetails]:
+    # Only the clients with records this week (and emergency contacts to send the report to)
+    return ClientDetails.objects.filter(
+        pk__in=ClientMedicationRecord.objects.filter(
+            created__gte=datetime.datetime.fromisoformat(params["start_week"]),
+            created__lte=datetime.datetime.fromisoformat(params["end_week"]),
+            client_medication__client__emergency_contact__medical_reports=True,
+        ).values("client_medication__client_id")
+    )
 
 
 @shared_task  # this task should be dispatched once a week (on Monday)
-def send_medication_report_to_client_emergency_contacts():
+def send_medication_report_to_client_emergency_contacts() -> int:
     ## Send medication report of the client to the client's emergency contacts for this week
     current_date = timezone.now()
     current_weekday = current_date.weekday()
@@ -339,40 +442,74 @@ def send_medication_report_to_client_emergency_contacts():
     end_week = current_date - datetime.timedelta(days=current_weekday)
     start_week = end_week - datetime.timedelta(days=7)
 
-    for client in ClientDetails.objects.all():
-        medications = ClientMedication.objects.filter(
-            client=client, start_date__gte=start_week, end_date__lte=end_week
-        ).all()
+    # The reports are rendered and sent by chunks of clients (in parallel), once per week
+    job = start_batch_job(
+        "weekly_medication_reports",
+        run_key=start_week.date().isoformat(),
+        params={"start_week": start_week.isoformat(), "end_week": end_week.isoformat()},
+    )
+    return job.pk
 
-        selected_medications = []
-        for medication in medications:
-            records = ClientMedicationRecord.objects.filter(
-                client_medication=medication, created__gte=start_week, created__lte=end_week
-            ).all()
 
-            if records:
-                selected_medications.append((medication, records))
+@batch_job(
+    "weekly_medication_reports",
+    queryset=get_medication_report_clients,
+    chunk_size=settings.MEDICATION_REPORTS_CHUNK_SIZE,
+)
+def send_medication_reports(clients: QuerySet[ClientDetails], params: dict) -> dict[str, int]:
+    """Render and send the medication reports of the clients for the week"""
+    client_ids = list(clients.values_list("pk", flat=True))
+    records = (
+        ClientMedicationRecord.objects.filter(
+            client_medication__client_id__in=client_ids,
+            created__gte=datetime.datetime.fromisoformat(params["start_week"]),
+            created__lte=datetime.datetime.fromisoformat(params["end_week"]),
+        )
+        .select_related("client_medication__client")
+        .order_by("client_medication__client_id", "client_medication_id", "time")
+    )
 
-        # Send email medication report to only the emergency contacts that have auto_reports enabled
+    # {client: {medication: [records]}}
+    records_per_client: dict[ClientDetails, dict[ClientMedication, list]] = defaultdict(
+        lambda: defaultdict(list)
+    )
+    for record in records:
+        medication = record.client_medication
+        records_per_client[medication.client][medication].append(record)
+
+    contacts_per_client: dict[int, list[ClientEmergencyContact]] = defaultdict(list)
+    for contact in ClientEmergencyContact.objects.filter(
+        client_id__in=client_ids, medical_reports=True
+    ):
+        contacts_per_client[contact.client_id].append(contact)  # type: ignore
+
+    sent = 0
+    for client, medications in records_per_client.items():
         # create the report
         report = render_to_string(
             "email_templates/medication_report.html",
             {
                 "client": client,
-                "selected_medications": selected_medications,
+                "selected_medications": list(medications.items()),
             },
         )
 
-        for contact in client.emergency_contact.filter(medical_reports=True).all():  # type: ignore
-            # send the report
+        # Send email medication report to only the emergency contacts that have medical_reports enabled
+        for contact in contacts_per_client[client.pk]:
             logger.debug(f"Sending medication report to {contact.email}")
-            send_mail_async(
-                subject="Medication Report",
-                message=report,
-                from_email=None,
-                recipient_list=[contact.email],
-                fail_silently=False,
+            # (queued once the chunk is checkpointed, a failed chunk doesn't send anything)
+            transaction.on_commit(
+                partial(
+                    queue_mail,
+                    subject="Medication Report",
+                    message=report,
+                    from_email=None,
+                    recipient_list=[contact.email],
+                )
             )
+            sent += 1
+
+    return {"reports_sent": sent}
 
 
 # Send incidents weekly
@@ -4,6 +4,8 @@ from decimal import Decimal
 from django.contrib.auth.hashers import make_password
 from django.core.files.base import ContentFile
 from django.core.files.storage import default_storage
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.db.utils import IntegrityError
 from django.shortcuts import get_list_or_404, get_object_or_404, render
 from django.template.loader import render_to_string
@@ -19,7 +21,7 @@ from adminmodif.models import Group, GroupMembership
 from adminmodif.permissions import IsMemberOfAuthorizedGroup, IsMemberOfManagement
 from authentication.models import CustomUser
 from client.filters import *
-from employees.models import ClientMedication
+from employees.models import ClientMedication, ClientMedicationRecord
 from employees.utils import generate_unique_username
 
 from .models import ClientDetails
@@ -111,6 +113,28 @@ class ClientListView(generics.ListAPIView):
     ordering = ["-created"]
     pagination_class = CustomPagination
 
+    def get_queryset(self):
+        # Everything the serializer needs for the whole page (instead of 4+ queries per client)
+        untaken_medications = (
+            ClientMedicationRecord.objects.filter(
+                client_medication__client=OuterRef("pk"),
+                status=ClientMedicationRecord.Status.NOT_TAKEN,
+            )
+            .order_by()
+            .values("client_medication__client")
+            .annotate(total=Count("id"))
+            .values("total")
+        )
+        return (
+            ClientDetails.objects.select_related("location")
+            .prefetch_related("documents")
+            .annotate(
+                untaken_medications=Coalesce(
+                    Subquery(untaken_medications, output_field=IntegerField()), 0
+                )
+            )
+        )
+
 
 class ClientUpdateView(generics.UpdateAPIView):
     permission_classes = [IsAuthenticated]
@@ -0,0 +1,68 @@
+# Generated by Django 5.0.1 on 2026-10-18 11:38
+
+from datetime import datetime
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_medication_slots(apps, schema_editor):
+    """Materialize the slots of the existing medications (same as ClientMedication.sync_schedule)"""
+    ClientMedication = apps.get_model("employees", "ClientMedication")
+    ClientMedicationSlot = apps.get_model("employees", "ClientMedicationSlot")
+
+    schedule = []
+    for medication in ClientMedication.objects.exclude(slots=None).iterator():
+        times = set()
+        for slot in medication.slots or []:
+            day = datetime.fromisoformat(slot["date"].split(".")[0])
+            for time in slot["times"]:
+                if time:
+                    hours, minutes = [int(value) for value in time.split(":")]
+                    times.add(day.replace(hour=hours, minute=minutes))
+
+        schedule.extend(
+            ClientMedicationSlot(client_medication_id=medication.pk, time=time) for time in times
+        )
+
+    ClientMedicationSlot.objects.bulk_create(schedule, batch_size=1000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("employees", "0065_alter_domaingoal_selected_maturity_matrix_assessment"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ClientMedicationSlot",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+                ("time", models.DateTimeField(db_index=True)),
+                (
+                    "client_medication",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="schedule",
+                        to="employees.clientmedication",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ("time",),
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="clientmedicationslot",
+            constraint=models.UniqueConstraint(
+                fields=("client_medication", "time"), name="unique_medication_slot_time"
+            ),
+        ),
+        migrations.RunPython(backfill_medication_slots, migrations.RunPython.noop),
+    ]
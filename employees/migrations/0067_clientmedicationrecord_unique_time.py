@@ -0,0 +1,43 @@
+# Generated by Django 5.0.1 on 2026-10-18 11:39
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def remove_duplicated_records(apps, schema_editor):
+    """Keep one record per (medication, time): the filled one if any, otherwise the oldest."""
+    ClientMedicationRecord = apps.get_model("employees", "ClientMedicationRecord")
+
+    duplicates = (
+        ClientMedicationRecord.objects.order_by()
+        .values("client_medication_id", "time")
+        .annotate(total=Count("id"))
+        .filter(total__gt=1)
+    )
+    for duplicate in duplicates.iterator():
+        records = list(
+            ClientMedicationRecord.objects.filter(
+                client_medication_id=duplicate["client_medication_id"], time=duplicate["time"]
+            ).order_by("id")
+        )
+        kept = next((record for record in records if record.status != "awaiting"), records[0])
+        ClientMedicationRecord.objects.filter(
+            id__in=[record.pk for record in records if record.pk != kept.pk]
+        ).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("employees", "0066_clientmedicationslot"),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicated_records, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="clientmedicationrecord",
+            constraint=models.UniqueConstraint(
+                fields=("client_medication", "time"), name="unique_medication_record_time"
+            ),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.0.1 on 2026-10-18 11:47
+
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def remove_duplicated_history(apps, schema_editor):
+    """Keep the first snapshot of every (goal, date)"""
+    GoalHistory = apps.get_model("employees", "GoalHistory")
+
+    kept_ids = (
+        GoalHistory.objects.order_by().values("goal_id", "date").annotate(kept_id=Min("id"))
+    ).values_list("kept_id", flat=True)
+    GoalHistory.objects.exclude(id__in=list(kept_ids)).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("employees", "0067_clientmedicationrecord_unique_time"),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicated_history, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="goalhistory",
+            constraint=models.UniqueConstraint(
+                fields=("goal", "date"), name="unique_goal_history_date"
+            ),
+        ),
+    ]
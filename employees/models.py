@@ -5,8 +5,7 @@ from datetime import datetime
 
 from django.conf import settings
 from django.core.exceptions import ValidationError
-from django.db import models
-from django.db.models import Q
+from django.db import connection, models
 from django.db.models.query import QuerySet
 from django.shortcuts import get_object_or_404
 from django.template.loader import render_to_string
@@ -67,23 +66,14 @@ class EmployeeProfile(models.Model):
         return Permission.objects.filter(id__in=self.get_permission_ids())
 
     def get_permission_ids(self) -> list[int]:
-        today = timezone.now()
-        return list(
-            filter(
-                lambda a: a,
-                EmployeeProfile.objects.filter(id=self.pk)
-                .filter(
-                    Q(groups__groupaccess__start_date__lte=today)
-                    | Q(groups__groupaccess__start_date__isnull=True),
-                    Q(groups__groupaccess__end_date__gte=today)
-                    | Q(groups__groupaccess__end_date__isnull=True),
-                )
-                .values_list("groups__permissions", flat=True),
-            )
-        )
+        from employees.permissions import get_employee_permissions
+
+        return list(get_employee_permissions(self.pk)["permissions"])
 
     def has_permission(self, permission_name: str) -> bool:
-        return self.__class__.objects.filter(groups__permissions__name=permission_name).exists()
+        from employees.permissions import get_employee_permissions
+
+        return permission_name in get_employee_permissions(self.pk)["permissions"].values()
 
 
 # this is a Group Access
@@ -387,7 +377,7 @@ class ClientMedication(models.Model):
         # ]
         available_datetime: list[datetime] = []
 
-        for slot in self.slots:
+        for slot in self.slots or []:
             day = datetime.fromisoformat(slot["date"].split(".")[0])
 
             for time in slot["times"]:
@@ -398,11 +388,41 @@ class ClientMedication(models.Model):
         return available_datetime
 
     def create_medication_records(self) -> None:
-        for slot in self.get_available_slots():
-            ClientMedicationRecord.objects.create(
-                client_medication=self,
-                time=slot,
+        ClientMedicationRecord.bulk_create_due(
+            [(self.pk, slot) for slot in self.get_available_slots()]
+        )
+
+    def save(self, *args, **kwargs):
+        result = super().save(*args, **kwargs)
+        self.sync_schedule()
+        return result
+
+    def sync_schedule(self) -> None:
+        """Materialize the ``slots`` (JSON) into the indexed dose times table (ClientMedicationSlot)"""
+        slots = set(self.get_available_slots())
+
+        self.schedule.exclude(time__in=slots).delete()  # type: ignore
+        ClientMedicationSlot.objects.bulk_create(
+            [ClientMedicationSlot(client_medication=self, time=slot) for slot in slots],
+            ignore_conflicts=True,  # (the already scheduled ones)
+        )
+
+
+class ClientMedicationSlot(models.Model):
+    """A dose time of a medication (see: ClientMedication.slots)"""
+
+    client_medication = models.ForeignKey(
+        ClientMedication, related_name="schedule", on_delete=models.CASCADE
+    )
+    time = models.DateTimeField(db_index=True)
+
+    class Meta:
+        ordering = ("time",)
+        constraints = [
+            models.UniqueConstraint(
+                fields=["client_medication", "time"], name="unique_medication_slot_time"
             )
+        ]
 
 
 class ClientMedicationRecord(models.Model):
@@ -425,55 +445,101 @@ class ClientMedicationRecord(models.Model):
 
     class Meta:
         ordering = ("-created",)
+        constraints = [
+            models.UniqueConstraint(
+                fields=["client_medication", "time"], name="unique_medication_record_time"
+            )
+        ]
+
+    @classmethod
+    def bulk_create_due(cls, slots: list[tuple[int, datetime]]) -> list[ClientMedicationRecord]:
+        """
+        Create the (awaiting) records of the given (medication id, time) slots in one query,
+        the already existing records are skipped so it's safe to be run concurrently.
+        Returns only the newly created records.
+        """
+        if not slots:
+            return []
+
+        # NOTE: bulk_create(ignore_conflicts=True) doesn't return the ids of the inserted rows
+        now = timezone.now()
+        values = ", ".join(["(%s, %s, %s, %s, %s, %s)"] * len(slots))
+        params: list = []
+        for medication_id, time in slots:
+            params.extend([medication_id, time, cls.Status.AWAITING, "", now, now])
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {connection.ops.quote_name(cls._meta.db_table)} "
+                "(client_medication_id, time, status, reason, updated, created) "
+                f"VALUES {values} "
+                "ON CONFLICT (client_medication_id, time) DO NOTHING RETURNING id",
+                params,
+            )
+            created_ids = [row[0] for row in cursor.fetchall()]
 
-    def notify(self):
-        logger.debug(f"Send Medical Notification {self.id}")
-        # inform client as well as his employee
-        # Send to the client
-        notification = Notification.objects.create(
-            title=f"It's time to take your medication (#{self.id}).",
-            event=Notification.EVENTS.MEDICATION_TIME,
-            content=f"You have a medication to take.",
-            receiver=self.client_medication.client.user,
-            metadata={"medication_id": self.client_medication.id, "medication_record_id": self.id},
+        if created_ids:
+            # (no post_save signals for the raw insert)
+            from system.counts import bump_model_version
+            from system.stats import invalidate_dashboard_stats
+
+            bump_model_version(cls)
+            invalidate_dashboard_stats("medications")
+
+        return list(
+            cls.objects.filter(id__in=created_ids).select_related(
+                "client_medication__client__user", "client_medication__administered_by__user"
+            )
         )
 
-        notification.notify()
+    def get_notifications(self) -> list[Notification]:
+        """The (unsaved) notifications of the record: for the client and the employee(s)"""
+        metadata = {"medication_id": self.client_medication.id, "medication_record_id": self.id}
+        # inform client as well as his employee
+        # Send to the client
+        notifications = [
+            Notification(
+                title=f"It's time to take your medication (#{self.id}).",
+                event=Notification.EVENTS.MEDICATION_TIME,
+                content=f"You have a medication to take.",
+                receiver=self.client_medication.client.user,
+                metadata=metadata,
+            )
+        ]
 
         # Send to the employee
         if self.client_medication.administered_by:
-            notification = Notification.objects.create(
-                title=f"Medication record (#{self.id}).",
-                event=Notification.EVENTS.MEDICATION_TIME,
-                content=f"You have a medication record to fill up.",
-                receiver=self.client_medication.administered_by.user,
-                metadata={
-                    "medication_id": self.client_medication.id,
-                    "medication_record_id": self.id,
-                },
+            notifications.append(
+                Notification(
+                    title=f"Medication record (#{self.id}).",
+                    event=Notification.EVENTS.MEDICATION_TIME,
+                    content=f"You have a medication record to fill up.",
+                    receiver=self.client_medication.administered_by.user,
+                    metadata=metadata,
+                )
             )
-
-            notification.notify()
         else:
             # Send to the employees that have "receive_medication_notifications" permission
-            employees = EmployeeProfile.objects.all()
-            for employee in employees:
-                logger.debug(f"Send Medical Notification {self.id} to employee")
+            from employees.permissions import get_user_ids_with_permission
 
-                medication_record_link = f"{settings.FRONTEND_BASE_URL}/clients/{employee.pk}/medications/{self.client_medication.pk}/records"
+            medication_record_link = f"{settings.FRONTEND_BASE_URL}/clients/{self.client_medication.client_id}/medications/{self.client_medication.pk}/records"
 
-                if employee.has_permission("medication.notifications.receive"):
-                    notification = Notification.objects.create(
+            for user_id in get_user_ids_with_permission("medication.notifications.receive"):
+                notifications.append(
+                    Notification(
                         title=f"Medication record (#{self.id}).",
                         event=Notification.EVENTS.MEDICATION_TIME,
                         content=f"You have a medication record to fill up ({medication_record_link}).",
-                        receiver=employee.user,
-                        metadata={
-                            "medication_id": self.client_medication.id,
-                            "medication_record_id": self.id,
-                        },
+                        receiver_id=user_id,
+                        metadata=metadata,
                     )
-                    notification.notify()
+                )
+
+        return notifications
+
+    def notify(self):
+        logger.debug(f"Send Medical Notification {self.id}")
+        Notification.bulk_notify(self.get_notifications())
 
 
 class ClientGoals(models.Model):
@@ -705,6 +771,11 @@ class GoalHistory(models.Model):
     date = models.DateField(auto_now_add=True, db_index=True)
     goal = models.ForeignKey(DomainGoal, related_name="history", on_delete=models.CASCADE)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["goal", "date"], name="unique_goal_history_date")
+        ]
+
 
 class GroupAccess(models.Model):
     employee = models.ForeignKey(EmployeeProfile, on_delete=models.CASCADE)
@@ -0,0 +1,118 @@
+"""
+Permissions resolution (honoring the ``GroupAccess`` start/end dates).
+
+The resolved permissions are cached in Redis under the global permissions version,
+which is bumped (see: employees.signals) whenever a ``GroupAccess``, a ``Group``
+or the permissions of a group change. A cached entry also expires at the next
+``GroupAccess`` start/end date, when the resolved permissions would change by themselves.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Min, Q
+from django.utils import timezone
+
+from adminmodif.models import Permission
+from employees.models import EmployeeProfile, GroupAccess
+
+PERMISSIONS_VERSION_KEY = "permissions:version"
+CACHE_KEY_PREFIX = "permissions"
+
+
+def get_permissions_version() -> int:
+    return cache.get_or_set(PERMISSIONS_VERSION_KEY, 0, timeout=None)
+
+
+def bump_permissions_version() -> None:
+    """Invalidate all the cached permissions."""
+    cache.add(PERMISSIONS_VERSION_KEY, 0, timeout=None)
+    cache.incr(PERMISSIONS_VERSION_KEY)
+
+
+def active_access_filter(now: datetime, prefix: str = "") -> Q:
+    """The ``GroupAccess`` (through ``prefix``) that are active at ``now``"""
+    return (
+        Q(**{f"{prefix}start_date__lte": now}) | Q(**{f"{prefix}start_date__isnull": True})
+    ) & (Q(**{f"{prefix}end_date__gte": now}) | Q(**{f"{prefix}end_date__isnull": True}))
+
+
+def get_next_access_change(now: datetime, **filters) -> datetime | None:
+    """The next start/end date of the (filtered) group accesses, after ``now``"""
+    accesses = GroupAccess.objects.filter(**filters)
+    boundaries = accesses.aggregate(
+        next_start=Min("start_date", filter=Q(start_date__gt=now)),
+        next_end=Min("end_date", filter=Q(end_date__gte=now)),
+    )
+    return min(filter(None, boundaries.values()), default=None)
+
+
+def get_cache_timeout(now: datetime, next_change: datetime | None, ttl: int | None = None) -> int:
+    timeout: int = ttl if ttl is not None else settings.PERMISSIONS_CACHE_TTL
+    if next_change is not None:
+        # (the end date is inclusive)
+        timeout = min(timeout, int((next_change - now).total_seconds()) + 1)
+    return max(timeout, 1)
+
+
+def load_employee_permissions(employee_id: int, now: datetime) -> dict[int, str]:
+    """The permissions ({id: name}) the employee currently holds, in one query."""
+    return dict(
+        Permission.objects.filter(
+            active_access_filter(now, prefix="group__groupaccess__"),
+            group__groupaccess__employee_id=employee_id,
+        )
+        .order_by()
+        .values_list("id", "name")
+        .distinct()
+    )
+
+
+def get_employee_permissions(employee_id: int) -> dict[str, Any]:
+    """
+    The effective permissions of the employee: ``{"permissions": {id: name}, "expires_at": ...}``,
+    ``expires_at`` is the next start/end date of its group accesses (when they change by themselves).
+    """
+    now = timezone.now()
+    cache_key = f"{CACHE_KEY_PREFIX}:{get_permissions_version()}:employee:{employee_id}"
+    effective_permissions: dict[str, Any] | None = cache.get(cache_key)
+    if effective_permissions is not None and (
+        effective_permissions["expires_at"] is None or now < effective_permissions["expires_at"]
+    ):
+        return effective_permissions
+
+    next_change = get_next_access_change(now, employee_id=employee_id)
+    effective_permissions = {
+        "permissions": load_employee_permissions(employee_id, now),
+        "expires_at": next_change,
+    }
+    cache.set(cache_key, effective_permissions, timeout=get_cache_timeout(now, next_change))
+    return effective_permissions
+
+
+def get_user_ids_with_permission(permission_name: str) -> set[int]:
+    """The ids of the users (employees) currently holding the permission, in one query."""
+    cache_key = f"{CACHE_KEY_PREFIX}:{get_permissions_version()}:users:{permission_name}"
+    user_ids: set[int] | None = cache.get(cache_key)
+    if user_ids is not None:
+        return user_ids
+
+    now = timezone.now()
+    # NOTE: the conditions must be within the same filter() to apply on the same GroupAccess
+    user_ids = set(
+        EmployeeProfile.objects.filter(
+            active_access_filter(now, prefix="groupaccess__"),
+            groupaccess__group__permissions__name=permission_name,
+        )
+        .order_by()
+        .values_list("user_id", flat=True)
+        .distinct()
+    )
+
+    next_change = get_next_access_change(now, group__permissions__name=permission_name)
+    cache.set(cache_key, user_ids, timeout=get_cache_timeout(now, next_change))
+    return user_ids
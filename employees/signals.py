@@ -1,8 +1,11 @@
 from django.contrib.auth import get_user_model
-from django.db.models.signals import post_save
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.dispatch import receiver
 
-from .models import EmployeeProfile
+from adminmodif.models import Group, Permission
+
+from .models import EmployeeProfile, GroupAccess
+from .permissions import bump_permissions_version
 
 # @receiver(post_save, sender=get_user_model())
 # def create_employee_profile(sender, instance, created, **kwargs):
@@ -11,3 +14,19 @@ from .models import EmployeeProfile
 
 # Send Notifications once an Appointement Creation/deletion/update
 # Inform employee and Client
+
+
+# Invalidate the cached permissions (see: employees.permissions)
+@receiver(post_save, sender=GroupAccess)
+@receiver(post_delete, sender=GroupAccess)
+@receiver(post_delete, sender=Group)
+@receiver(post_save, sender=Permission)
+@receiver(post_delete, sender=Permission)
+def refresh_permissions_on_change(sender, **kwargs):
+    bump_permissions_version()
+
+
+@receiver(m2m_changed, sender=Group.permissions.through)
+def refresh_permissions_on_group_change(sender, action: str, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        bump_permissions_version()
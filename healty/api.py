@@ -1,5 +1,4 @@
 from django.conf import settings
-from django.shortcuts import get_object_or_404
 from ninja import NinjaAPI
 from ninja.security import HttpBearer
 from rest_framework_simplejwt.authentication import JWTTokenUserAuthentication
@@ -7,7 +6,7 @@ from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidTok
 
 from ai.api import router as ai_router
 from assessments.api import router as assessment_router
-from authentication.models import CustomUser
+from authentication.principals import get_authenticated_user
 from client.api import router as contract_router
 from system.api import router as system_router
 
@@ -18,8 +17,9 @@ class TokenAuth(HttpBearer):
             jwt = JWTTokenUserAuthentication()
             validated_token = jwt.get_validated_token(token)
             jwt_user = jwt.get_user(validated_token)
-            user = get_object_or_404(CustomUser, id=jwt_user.id)
-            request.user = user
+            user = get_authenticated_user(jwt_user.id)  # (None if deleted or deactivated)
+            if user is not None:
+                request.user = user
             return user
         except (InvalidToken, AuthenticationFailed):
             pass
@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.template.loader import render_to_string
+
+from client.tasks import PDF_DOCUMENT_MODELS
+from system.pdf import PDFRenderer
+
+
+class Command(BaseCommand):
+    help = "Benchmark cold vs warm PDF rendering (invoice and questionnaires)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=5)
+
+    def handle(self, *args, **options):
+        iterations: int = options["iterations"]
+
+        for document_type, model in PDF_DOCUMENT_MODELS.items():
+            document = model.objects.order_by("-id").first()
+            if document is None:
+                self.stdout.write(self.style.WARNING(f"{document_type}: no document to render"))
+                continue
+
+            html_string = render_to_string(document.pdf_template_name, document.get_pdf_context())
+
+            # Cold: a new renderer per render (nothing is reused)
+            cold_durations = []
+            for _ in range(iterations):
+                started = time.perf_counter()
+                PDFRenderer().render(html_string)
+                cold_durations.append(time.perf_counter() - started)
+
+            # Warm: the same renderer is reused (after a first warm-up render)
+            renderer = PDFRenderer()
+            renderer.render(html_string)
+            warm_durations = []
+            for _ in range(iterations):
+                started = time.perf_counter()
+                renderer.render(html_string)
+                warm_durations.append(time.perf_counter() - started)
+
+            cold = sum(cold_durations) / iterations * 1000
+            warm = sum(warm_durations) / iterations * 1000
+            self.stdout.write(
+                f"{document_type} (#{document.pk}): cold {cold:.0f}ms | warm {warm:.0f}ms | "
+                f"x{cold / warm:.2f}"
+            )
+
+        self.stdout.write(self.style.SUCCESS("Benchmark done."))
@@ -252,7 +252,69 @@ broker_connection_retry = True
 CELERY_TASK_TIME_LIMIT = 900
 CELERY_TASK_SOFT_TIME_LIMIT = 850
 
+# Every queue has its own workers (see: docker-compose.yml), so a long LLM or batch run can't
+# delay the time-sensitive tasks (e.g. the medication reminders):
+# - "realtime": the minute-level medication records and notifications.
+# - "llm": the OpenAI calls (I/O bound, handled by a threads pool).
+# - "pdf": the WeasyPrint renders (CPU bound, handled by a process pool).
+# - "email": the SMTP deliveries (I/O bound, handled by a threads pool).
+# - "batch": the chunks of the periodic batch jobs (see: system.batch).
+# - "default": everything else (e.g. the periodic jobs dispatching the batches).
+CELERY_TASK_DEFAULT_QUEUE = "default"
+CELERY_TASK_ROUTES = {
+    "client.tasks.create_and_send_medication_record_notification": {"queue": "realtime"},
+    "ai.tasks.*": {"queue": "llm"},
+    "client.tasks.render_pdf_document": {"queue": "pdf"},
+    "system.tasks.send_notification_emails": {"queue": "email"},
+    "system.tasks.flush_mail_queue": {"queue": "email"},
+    "system.utils.send_mail_async": {"queue": "email"},
+    "client.tasks.send_progress_report_email": {"queue": "email"},
+    "system.tasks.run_batch_chunk": {"queue": "batch"},
+    "system.tasks.finalize_batch_job": {"queue": "batch"},
+}
+# The workers reserve one task at a time (the long tasks don't hold the short ones back)
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+
+# Generated PDFs cache (see: system.pdf), bump the version when the PDF templates change.
+PDF_TEMPLATE_VERSION: str = "1"
+PDF_CACHE_MAX_ENTRIES: int = 5000
+# Warm PDF renderer (see: system.pdf.PDFRenderer)
+PDF_TEMPLATES_DIR: str = os.path.join(BASE_DIR, "client", "templates")
+PDF_STYLESHEETS: list[str] = [os.path.join(PDF_TEMPLATES_DIR, "styles.css")]
+
+# Chunked periodic jobs (see: system.batch)
+BATCH_JOB_CHUNK_SIZE: int = 100  # rows per chunk
+BATCH_CHUNK_MAX_RETRIES: int = 3
+BATCH_CHUNK_RETRY_DELAY: int = 30  # in seconds (doubled at each retry)
+BATCH_CHUNK_MAX_ATTEMPTS: int = 12  # the chunks are not resumed beyond
+BATCH_JOB_STALLED_AFTER: int = 2 * CELERY_TASK_TIME_LIMIT  # in seconds
+
+DASHBOARD_STATS_CACHE_TTL: int = 5 * 60  # in seconds (see: system.stats)
+
+# The emails are sent by batches over a persistent SMTP connection per worker (see: system.mail)
+MAIL_BATCH_SIZE: int = 50
+MAIL_QUEUE_FLUSH_DELAY: int = 5  # in seconds (the queued emails are grouped meanwhile)
+MAIL_MAX_RETRIES: int = 5
+MAIL_RETRY_BACKOFF: int = 30  # in seconds (doubled at each retry)
+MAIL_RETRY_BACKOFF_MAX: int = 30 * 60  # in seconds
+
+# DBSettings cache (see: system.models.DBSettings)
+DB_SETTINGS_REVALIDATE_INTERVAL: float = 5  # in seconds
+DB_SETTINGS_CACHE_TTL: int = 24 * 60 * 60  # in seconds
+
+UNREAD_NOTIFICATIONS_CACHE_TTL: int = 24 * 60 * 60  # in seconds (see: system.unread)
+
+# Resolved permissions cache (see: employees.permissions)
+PERMISSIONS_CACHE_TTL: int = 10 * 60  # in seconds
+# Authenticated principals cache (see: authentication.principals)
+PRINCIPAL_CACHE_TTL: int = 60  # in seconds
+
+# Paginated lists counts (see: system.counts)
+PAGINATION_COUNT_CACHE_TTL: int = 60  # in seconds
+PAGINATION_ESTIMATE_COUNT_THRESHOLD: int = 10_000  # the smaller tables are counted exactly
+
 MEDICATION_RECORDS_CREATATION: int = 1  # in minutes
+MEDICATION_REPORTS_CHUNK_SIZE: int = 50  # clients per weekly report subtask
 PROTECTED_EMAIL_EXPIRATION_DAYS: int = 7  # in days (this is for protected email expiration days)
 
 CELERY_BEAT_SCHEDULE = {
@@ -285,6 +347,10 @@ CELERY_BEAT_SCHEDULE = {
         "schedule": crontab(minute=f"*/{MEDICATION_RECORDS_CREATATION}"),  # in minutes
         # "schedule": MEDICATION_RECORDS_CREATATION * 60,  # in seconds
     },
+    "resume_batch_jobs": {
+        "task": "system.tasks.resume_batch_jobs",
+        "schedule": crontab(minute="*/15"),
+    },
     "send_contract_reminders": {
         "task": "client.tasks.send_contract_reminders",
         "schedule": crontab(minute="0", hour="0", day_of_month="*"),  # every day
@@ -293,10 +359,19 @@ CELERY_BEAT_SCHEDULE = {
         "task": "client.tasks.delete_unused_attachments",
         "schedule": crontab(minute="0", hour="*"),  # hour
     },
-    # "record_goals_and_objectives_history": {
-    #     "task": "client.tasks.record_goals_and_objectives_history",
-    #     "schedule": crontab(minute="0", hour="1", day_of_month="*"),  # everyday (must be everyday)
-    # },
+    "flush_mail_queue": {
+        # (the queued emails left once the retries of their flush are exhausted)
+        "task": "system.tasks.flush_mail_queue",
+        "schedule": crontab(minute="*/5"),
+    },
+    "evict_pdf_cache": {
+        "task": "system.tasks.evict_pdf_cache",
+        "schedule": crontab(minute="30", hour="2"),  # everyday
+    },
+    "record_goals_and_objectives_history": {
+        "task": "client.tasks.record_goals_and_objectives_history",
+        "schedule": crontab(minute="0", hour="1", day_of_month="*"),  # everyday (must be everyday)
+    },
     "send_medication_report_to_client_emergency_contacts": {
         "task": "client.tasks.send_medication_report_to_client_emergency_contacts",
         "schedule": crontab(minute="1", hour="0", day_of_week="0"),  # every week
@@ -319,10 +394,17 @@ EMAIL_HOST_USER: str = os.getenv("EMAIL_HOST_USER", "")
 EMAIL_HOST_PASSWORD: str = os.getenv("EMAIL_HOST_PASSWORD", "")
 EMAIL_USE_TLS: bool = bool(int(os.getenv("EMAIL_USE_TLS", 0)))
 EMAIL_BACKEND: str = "django.core.mail.backends.smtp.EmailBackend"
+EMAIL_TIMEOUT: int = 30  # in seconds (the SMTP connections are kept open by the workers)
 
 # OpenAI API settings
 OPENAI_KEY: str = os.getenv("OPENAI_KEY", "")
 OPENAI_MODEL: str = os.getenv("OPENAI_MODEL", "gpt-4")
+# Concurrent LLM calls (see: ai.llm)
+LLM_MAX_CONCURRENCY: int = 5  # simultaneous calls (per batch)
+LLM_TIMEOUT: float = 60  # in seconds (per call)
+LLM_MAX_RETRIES: int = 2
+LLM_RETRY_BACKOFF: float = 1  # in seconds (doubled at each retry)
+LLM_RETRY_BACKOFF_MAX: float = 30  # in seconds
 
 # Default tax
 DEFAULT_TAX: int = 0  # 0%
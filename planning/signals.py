@@ -11,25 +11,23 @@ from .models import Appointment
 
 @receiver(post_save, sender=Appointment)
 def appointment_created(sender, instance: Appointment, created, **kwargs):
-    employees: list[EmployeeProfile] = list(instance.employees.all())
-    clients: list[ClientDetails] = list(instance.clients.all())
+    employees: list[EmployeeProfile] = list(instance.employees.select_related("user"))
+    clients: list[ClientDetails] = list(instance.clients.select_related("user"))
     receiver_list: list[CustomUser] = [p.user for p in (employees + clients)]
 
     if created:
         print("signal: appointment created")
         # Sending notification for all employees and clients
-        for user in receiver_list:
-            # send a notification: appointment created
-            notification = Notification.objects.create(
-                title="Appointment created",
-                event=Notification.EVENTS.APPOINTMENT_CREATED,
-                content=f"A new appointment has been scheduled at {instance.start_time}.",
-                receiver=user,
-                metadata={"appointment_id": instance.id},
-            )
-
-            message = f"A new appointment has been scheduled:\n\ntitle: {instance.title}\nstart: {instance.start_time}."
-            notification.notify(email_title="Appointment created", email_content=message)
+        message = f"A new appointment has been scheduled:\n\ntitle: {instance.title}\nstart: {instance.start_time}."
+        Notification.fan_out(
+            receiver_list,
+            title="Appointment created",
+            event=Notification.EVENTS.APPOINTMENT_CREATED,
+            content=f"A new appointment has been scheduled at {instance.start_time}.",
+            metadata={"appointment_id": instance.id},
+            email_title="Appointment created",
+            email_content=message,
+        )
     else:
         # Appointment updated
         pass
@@ -40,8 +38,8 @@ def appointment_rescheduled_or_canceled(sender, instance: Appointment, **kwargs)
     if instance.pk is not None:
         old_instance: Appointment = Appointment.objects.filter(id=instance.id).get()
 
-        employees: list[EmployeeProfile] = list(instance.employees.all())
-        clients: list[ClientDetails] = list(instance.clients.all())
+        employees: list[EmployeeProfile] = list(instance.employees.select_related("user"))
+        clients: list[ClientDetails] = list(instance.clients.select_related("user"))
         receiver_list: list[CustomUser] = [p.user for p in (employees + clients)]
 
         if old_instance.start_time != instance.start_time:
@@ -49,18 +47,16 @@ def appointment_rescheduled_or_canceled(sender, instance: Appointment, **kwargs)
 
             # The appointment has been rescheduled
             # Sending notification for all employees and clients
-            for user in receiver_list:
-                # send a notification: appointment created
-                notification = Notification.objects.create(
-                    title="Appointment rescheduled",
-                    event=Notification.EVENTS.APPOINTMENT_RESCHEDULED,
-                    content=f"The appointment #{instance.id} has been rescheduled to {instance.start_time}.",
-                    receiver=user,
-                    metadata={"appointment_id": instance.id},
-                )
-
-                message = f"The appointment #{instance.id} has been rescheduled:\n\ntitle: {instance.title}\nstart: {instance.start_time}."
-                notification.notify(email_title="Appointment rescheduled", email_content=message)
+            message = f"The appointment #{instance.id} has been rescheduled:\n\ntitle: {instance.title}\nstart: {instance.start_time}."
+            Notification.fan_out(
+                receiver_list,
+                title="Appointment rescheduled",
+                event=Notification.EVENTS.APPOINTMENT_RESCHEDULED,
+                content=f"The appointment #{instance.id} has been rescheduled to {instance.start_time}.",
+                metadata={"appointment_id": instance.id},
+                email_title="Appointment rescheduled",
+                email_content=message,
+            )
 
         if (
             old_instance.status != old_instance.STATUS.CANCELED
@@ -69,38 +65,32 @@ def appointment_rescheduled_or_canceled(sender, instance: Appointment, **kwargs)
             # Appointment updated (check for cancelation)
             print("signal: appointment canceled")
 
-            for user in receiver_list:
-                # send a notification: appointment canceled
-                notification = Notification.objects.create(
-                    title="Appointment canceled",
-                    event=Notification.EVENTS.APPOINTMENT_CANCELED,
-                    content=f"The appointment #{instance.id} has been canceled.",
-                    receiver=user,
-                    metadata={"appointment_id": instance.id},
-                )
-
-                message = f"The appointment #{instance.id} has been canceled."
-                notification.notify(email_title="Appointment canceled", email_content=message)
+            Notification.fan_out(
+                receiver_list,
+                title="Appointment canceled",
+                event=Notification.EVENTS.APPOINTMENT_CANCELED,
+                content=f"The appointment #{instance.id} has been canceled.",
+                metadata={"appointment_id": instance.id},
+                email_title="Appointment canceled",
+                email_content=f"The appointment #{instance.id} has been canceled.",
+            )
 
 
 @receiver(post_delete, sender=Appointment)
 def appointment_deleted(sender, instance: Appointment, **kwargs):
 
     if instance:
-        employees: list[EmployeeProfile] = list(instance.employees.all())
-        clients: list[ClientDetails] = list(instance.clients.all())
+        employees: list[EmployeeProfile] = list(instance.employees.select_related("user"))
+        clients: list[ClientDetails] = list(instance.clients.select_related("user"))
         receiver_list: list[CustomUser] = [p.user for p in (employees + clients)]
 
         print("signal: appointment canceled/deleted")
 
-        for user in receiver_list:
-            # send a notification: appointment canceled
-            notification = Notification.objects.create(
-                title="Appointment canceled",
-                event=Notification.EVENTS.APPOINTMENT_CANCELED,
-                content=f"The appointment #{instance.id} has been canceled.",
-                receiver=user,
-            )
-
-            message = f"The appointment #{instance.id} has been canceled."
-            notification.notify(email_title="Appointment canceled", email_content=message)
+        Notification.fan_out(
+            receiver_list,
+            title="Appointment canceled",
+            event=Notification.EVENTS.APPOINTMENT_CANCELED,
+            content=f"The appointment #{instance.id} has been canceled.",
+            email_title="Appointment canceled",
+            email_content=f"The appointment #{instance.id} has been canceled.",
+        )
@@ -1,6 +1,13 @@
 from django.contrib import admin
 
-from system.models import AttachmentFile, DBSettings, Expense, Notification
+from system.models import (
+    AttachmentFile,
+    BatchJob,
+    BatchJobChunk,
+    DBSettings,
+    Expense,
+    Notification,
+)
 
 
 @admin.register(DBSettings)
@@ -27,3 +34,26 @@ class ExpenseAdmin(admin.ModelAdmin):
     list_display = ("id", "amount", "desc", "created")
     list_filter = ("created",)
     search_fields = ("id",)
+
+
+class BatchJobChunkInline(admin.TabularInline):
+    model = BatchJobChunk
+    fields = ("start_pk", "end_pk", "status", "attempts", "error", "finished_at")
+    readonly_fields = fields
+    extra = 0
+
+
+@admin.register(BatchJob)
+class BatchJobAdmin(admin.ModelAdmin):
+    list_display = (
+        "id",
+        "name",
+        "run_key",
+        "status",
+        "completed_chunks",
+        "total_chunks",
+        "created",
+    )
+    list_filter = ("name", "status", "created")
+    search_fields = ("run_key",)
+    inlines = (BatchJobChunkInline,)
@@ -1,7 +1,6 @@
 from typing import Any
 from uuid import UUID
 
-from django.db.models import ExpressionWrapper, F, FloatField, Sum
 from django.http import HttpRequest
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
@@ -11,15 +10,11 @@ from ninja import Query, Router, UploadedFile
 from ninja.pagination import paginate
 
 from adminmodif.models import Group, Permission
-from authentication.models import Location
-from client.models import ClientDetails, ClientEmergencyContact, Contract, Invoice
-from employees.models import (
-    ClientMedication,
-    ClientMedicationRecord,
-    EmployeeProfile,
-    GroupAccess,
-)
+from client.models import ClientEmergencyContact
+from employees.models import EmployeeProfile, GroupAccess
+from system import unread
 from system.filters import ExpenseSchemaFilter
+from system.mail import get_mail_stats
 from system.models import (
     AttachmentFile,
     DBSettings,
@@ -27,6 +22,7 @@ from system.models import (
     Notification,
     ProtectedEmail,
 )
+from system.pdf import get_pdf_cache_stats
 from system.schemas import (
     ActivityLogSchema,
     AttachmentFilePatch,
@@ -44,10 +40,16 @@ from system.schemas import (
     GroupSchemaInput,
     GroupSchemaPatch,
     GroupsListSchema,
+    MailStatsSchema,
     NotificationSchema,
+    NotificationsReadInput,
+    NotificationsReadSchema,
     PassKeySchema,
+    PDFCacheStatsSchema,
     ProtectedEmailSchema,
+    UnreadNotificationsCountSchema,
 )
+from system.stats import get_dashboard_stats, get_section_stats
 from system.utils import NinjaCustomPagination
 
 router = Router()
@@ -59,7 +61,7 @@ def settings(request: HttpRequest):
 
 
 @router.get("/notifications", response=list[NotificationSchema])
-@paginate(NinjaCustomPagination)
+@paginate(NinjaCustomPagination, ordering=("-created", "-id"), count_strategy="cached")
 def notifications(request: HttpRequest):
     user = request.user
     return Notification.objects.filter(receiver=user).all()
@@ -77,15 +79,26 @@ def mark_as_read(request, id: int):
     try:
         notification = Notification.objects.get(id=id)
 
-        if notification.receiver == request.user:
-            notification.is_read = True
-            notification.save()
+        if notification.receiver_id == request.user.id:
+            unread.mark_as_read(request.user.id, [notification.pk])
             return 201, {}
-        return 401, {"message", "Unauthorized action/request!"}
+        return 401, {"message": "Unauthorized action/request!"}
     except Notification.DoesNotExist:
         return 404, {"message": "Notification not found"}
 
 
+@router.get("/notifications/unread-count", response=UnreadNotificationsCountSchema)
+def unread_notifications_count(request: HttpRequest):
+    return {"count": unread.get_unread_count(request.user.id)}
+
+
+@router.post("/notifications/read", response=NotificationsReadSchema)
+def mark_notifications_as_read(request: HttpRequest, payload: NotificationsReadInput):
+    """Mark the given notifications (or all of them) as read"""
+    updated = unread.mark_as_read(request.user.id, payload.ids)
+    return {"updated": updated, "unread": unread.get_unread_count(request.user.id)}
+
+
 @router.get("/attachments", response=list[AttachmentFileSchema])
 @paginate(NinjaCustomPagination)
 def attachments(request: HttpRequest):
@@ -120,6 +133,18 @@ def update_attachment(request: HttpRequest, uuid: UUID, attachment: AttachmentFi
     return get_object_or_404(AttachmentFile, id=uuid)
 
 
+@router.get("/attachments/pdf-cache/stats", response=PDFCacheStatsSchema)
+def pdf_cache_stats(request: HttpRequest):
+    """Generated PDFs cache metrics (hit ratio and number of cached PDFs)"""
+    return get_pdf_cache_stats()
+
+
+@router.get("/mail/stats", response=MailStatsSchema)
+def mail_stats(request: HttpRequest):
+    """Mail delivery metrics (throughput, SMTP connections and queued emails)"""
+    return get_mail_stats()
+
+
 @router.get("/expenses", response=list[ExpenseSchema])
 @paginate(NinjaCustomPagination)
 def expenses(request: HttpRequest, filter: ExpenseSchemaFilter = Query()):  # type: ignore
@@ -155,120 +180,14 @@ def dashboard(request: HttpRequest):
     - Revenue (Total income, total outcome/cost)
     """
 
-    # Fetch all the needed data from DB here, then pass it to the dectionary bellow
-
-    total_missing_documents: int = 0
-    total_missing_documents_profiles: int = 0
-    for client in ClientDetails.objects.all():
-        document_info = client.documents_info()
-        total_missing_documents += len(document_info["not_uploaded_document_labels"])
-        if total_missing_documents:
-            total_missing_documents_profiles += 1
-
-    return {
-        # User's stats
-        "users": {
-            "total_users": ClientDetails.objects.count(),
-            "total_in_care_users": ClientDetails.objects.filter(status="In Care").count(),
-            "total_out_of_care_users": ClientDetails.objects.filter(status="Out Of Care").count(),
-            "total_on_waiting_list_users": ClientDetails.objects.filter(
-                status="On Waiting List"
-            ).count(),
-            "total_missing_documents": total_missing_documents,
-            "total_missing_documents_profiles": total_missing_documents_profiles,
-        },
-        # Contract stats
-        "contracts": {
-            "total_contracts": Contract.objects.count(),
-            "total_accommodation_contracts": Contract.objects.filter(
-                care_type=Contract.CareTypes.ACCOMMODATION
-            ).count(),
-            "total_ambulante_contracts": Contract.objects.filter(
-                care_type=Contract.CareTypes.AMBULANTE
-            ).count(),
-            "total_approved_contracts": Contract.objects.filter(
-                status=Contract.Status.APPROVED
-            ).count(),
-            "total_stopped_contracts": Contract.objects.filter(
-                status=Contract.Status.STOPPED
-            ).count(),
-            "total_terminated_contracts": Contract.objects.filter(
-                status=Contract.Status.TERMINATED
-            ).count(),
-        },
-        # Medication's stats
-        "medications": {
-            "total_attachments": AttachmentFile.objects.filter(is_used=True).count(),
-            "total_medications": ClientMedication.objects.count(),
-            "total_critical_medications": ClientMedication.objects.filter(
-                is_critical=True
-            ).count(),
-            "total_medication_records": ClientMedicationRecord.objects.count(),
-            "total_taken_medication_records": ClientMedicationRecord.objects.filter(
-                status=ClientMedicationRecord.Status.TAKEN
-            ).count(),
-            "total_not_taken_medication_records": ClientMedicationRecord.objects.filter(
-                status=ClientMedicationRecord.Status.NOT_TAKEN
-            ).count(),
-            "total_waiting_medication_records": ClientMedicationRecord.objects.filter(
-                status=ClientMedicationRecord.Status.AWAITING
-            ).count(),
-        },
-        # Financial stats
-        ## Invoice's stats
-        "invoices": {
-            "total_invoices": Invoice.objects.count(),
-            "total_paid_invoices": Invoice.objects.filter(status=Invoice.Status.PAID).count(),
-            "total_partially_paid_invoices": Invoice.objects.filter(
-                status=Invoice.Status.PARTIALLY_PAID
-            ).count(),
-            "total_outstanding_invoices": Invoice.objects.filter(
-                status=Invoice.Status.OUTSTANDING
-            ).count(),
-            "total_overpaid_invoices": Invoice.objects.filter(
-                status=Invoice.Status.OVERPAID
-            ).count(),
-        },
-        ### Total income
-        "finance": {
-            "total_paid_amount": Invoice.objects.values_list(
-                "history__amount", flat=True
-            ).aggregate(total=Sum("history__amount"))["total"],
-            # ## Fetch the costs/charges (outcome)
-            "total_expenses": Expense.objects.aggregate(
-                total=Sum(
-                    ExpressionWrapper(
-                        F("amount") * (1 + F("tax") / 100), output_field=FloatField()
-                    )
-                )
-            )["total"],
-        },
-    }
+    # Computed with conditional aggregations and cached per section (see: system.stats)
+    return get_dashboard_stats()
 
 
 @router.get("/dashboard/analytics/locations", response=list[dict[str, Any]], tags=["analytics"])
 def locations_stats(request: HttpRequest):
-    locations = Location.objects.all()
-
-    location_stats = []
-
-    for location in locations:
-        location_stats.append(
-            {
-                "location_name": location.name,
-                "location_id": location.id,
-                "location_capacity": location.capacity,
-                "total_employees": location.employee_location.count(),
-                # "total_clients": ClientDetails.objects.filter(
-                #     location__id=location.pk, contracts__care_type=Contract.CareTypes.ACCOMMODATION
-                # ).count(),
-                "total_clients": location.client_location.count(),
-                "total_expenses": location.get_total_expenses(),
-                "total_revenue": location.get_total_revenue(),
-            }
-        )
-
-    return location_stats
+    # Annotated in one grouped query and cached (see: system.stats)
+    return get_section_stats("locations")
 
 
 # @router.get("/dashboard/analytics/expenses")
@@ -278,7 +197,7 @@ def locations_stats(request: HttpRequest):
 
 # Activity Log
 @router.get("/logs/activities", response=list[ActivityLogSchema])
-@paginate(NinjaCustomPagination)
+@paginate(NinjaCustomPagination, ordering=("-datetime", "-id"), count_strategy="cached")
 def activity_logs(request: HttpRequest):
     return CRUDEvent.objects.filter(user__isnull=False).all()
 
@@ -437,4 +356,3 @@ def verify_network_email(request: HttpRequest, uuid: UUID):
     contact = get_object_or_404(ClientEmergencyContact, uuid=uuid)
     contact.verify_email(uuid)
     return 204, {}
-    
\ No newline at end of file
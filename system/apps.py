@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class SystemConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "system"
+
+    def ready(self) -> None:
+        from . import signals
@@ -0,0 +1,250 @@
+"""
+Chunked, resumable batch jobs (for the periodic jobs processing a whole table).
+
+A job partitions its queryset into primary-key ranges (``chunk_size`` rows each), the chunks
+are processed in parallel by the ``run_batch_chunk`` tasks of a Celery chord, whose callback
+(``finalize_batch_job``) aggregates their results. Every chunk is processed and checkpointed
+within one transaction, so a crash never leaves a partially processed chunk behind.
+
+A run is identified by its ``run_key`` (e.g. the billed month): starting it again resumes its
+unfinished chunks instead of starting over, and the stalled runs are resumed periodically
+(by ``resume_batch_jobs``).
+
+    @batch_job("monthly_invoices", queryset=lambda params: ClientDetails.objects.all())
+    def bill_clients(clients: QuerySet[ClientDetails], params: dict) -> dict[str, int]:
+        ...
+
+    start_batch_job("monthly_invoices", run_key="2024-05", params={...})
+"""
+
+from __future__ import annotations
+
+import datetime
+from typing import Any, Callable
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Q, QuerySet
+from django.utils import timezone
+from loguru import logger
+
+from system.models import BatchJob, BatchJobChunk
+
+BATCH_JOBS: dict[str, BatchJobDefinition] = {}
+
+
+class BatchJobDefinition:
+    def __init__(
+        self,
+        name: str,
+        process: Callable[[QuerySet, dict], dict[str, Any]],
+        get_queryset: Callable[[dict], QuerySet],
+        chunk_size: int | None = None,
+    ) -> None:
+        self.name = name
+        self.process = process
+        self.get_queryset = get_queryset
+        self.chunk_size: int = chunk_size or settings.BATCH_JOB_CHUNK_SIZE
+
+    def get_chunk_queryset(self, chunk: BatchJobChunk, params: dict) -> QuerySet:
+        return self.get_queryset(params).filter(pk__gte=chunk.start_pk, pk__lte=chunk.end_pk)
+
+
+def batch_job(name: str, queryset: Callable[[dict], QuerySet], chunk_size: int | None = None):
+    """Register the decorated function as the processing of a chunk of the job"""
+
+    def decorator(process):
+        BATCH_JOBS[name] = BatchJobDefinition(name, process, queryset, chunk_size)
+        return process
+
+    return decorator
+
+
+def get_definition(name: str) -> BatchJobDefinition:
+    try:
+        return BATCH_JOBS[name]
+    except KeyError:
+        raise ValueError(f"Unknown batch job: {name}")
+
+
+def get_pk_ranges(queryset: QuerySet, chunk_size: int) -> list[tuple[int, int]]:
+    """Partition the queryset into ranges of ``chunk_size`` primary keys (in one query)"""
+    ranges: list[tuple[int, int]] = []
+    start_pk = end_pk = None
+    count = 0
+
+    for pk in queryset.order_by("pk").values_list("pk", flat=True).iterator(chunk_size=2000):
+        if start_pk is None:
+            start_pk = pk
+        end_pk = pk
+        count += 1
+        if count == chunk_size:
+            ranges.append((start_pk, end_pk))
+            start_pk, count = None, 0
+
+    if start_pk is not None:
+        ranges.append((start_pk, end_pk))  # type: ignore
+    return ranges
+
+
+def start_batch_job(name: str, run_key: str, params: dict[str, Any] | None = None) -> BatchJob:
+    """
+    Start the run of the job (or resume it if it already exists, with its original params),
+    the chunks are dispatched once the transaction is committed.
+    """
+    definition = get_definition(name)
+
+    with transaction.atomic():
+        job, created = BatchJob.objects.select_for_update().get_or_create(
+            name=name, run_key=run_key, defaults={"params": params or {}}
+        )
+        if job.status == BatchJob.Status.COMPLETED:
+            logger.debug(f"Batch job {job}: already completed.")
+            return job
+
+        if created:
+            ranges = get_pk_ranges(definition.get_queryset(job.params), definition.chunk_size)
+            BatchJobChunk.objects.bulk_create(
+                [
+                    BatchJobChunk(job=job, start_pk=start_pk, end_pk=end_pk)
+                    for start_pk, end_pk in ranges
+                ]
+            )
+            job.total_chunks = len(ranges)
+            logger.debug(f"Batch job {job}: {len(ranges)} chunks.")
+        else:
+            logger.debug(f"Batch job {job}: resumed.")
+
+        job.status = BatchJob.Status.RUNNING
+        job.save()
+
+        chunk_ids = list(
+            job.chunks.exclude(status=BatchJobChunk.Status.COMPLETED).values_list("id", flat=True)
+        )
+        transaction.on_commit(lambda: dispatch_chunks(job.pk, chunk_ids))
+
+    return job
+
+
+def dispatch_chunks(job_id: int, chunk_ids: list[int]) -> None:
+    from celery import chord
+    from system.tasks import finalize_batch_job, run_batch_chunk
+
+    if not chunk_ids:
+        finalize_batch_job.delay(job_id)
+        return
+
+    chord(run_batch_chunk.s(chunk_id) for chunk_id in chunk_ids)(finalize_batch_job.si(job_id))
+
+
+def run_chunk(chunk_id: int) -> dict[str, Any] | None:
+    """
+    Process the chunk and checkpoint it in the same transaction (the processing is rolled back
+    on failure), returns None if the chunk is already completed or processed by another worker.
+    """
+    error: Exception | None = None
+
+    with transaction.atomic():
+        chunk: BatchJobChunk | None = (
+            BatchJobChunk.objects.select_for_update(skip_locked=True, of=("self",))
+            .select_related("job")
+            .exclude(status=BatchJobChunk.Status.COMPLETED)
+            .filter(id=chunk_id)
+            .first()
+        )
+        if chunk is None:
+            return None
+
+        definition = get_definition(chunk.job.name)
+        chunk.attempts += 1
+        try:
+            with transaction.atomic():
+                result = definition.process(
+                    definition.get_chunk_queryset(chunk, chunk.job.params), chunk.job.params
+                )
+        except Exception as e:
+            logger.exception(f"Batch job {chunk.job}: the chunk #{chunk.pk} failed.")
+            error = e
+            chunk.status = BatchJobChunk.Status.FAILED
+            chunk.error = repr(e)
+        else:
+            chunk.status = BatchJobChunk.Status.COMPLETED
+            chunk.result = result or {}
+            chunk.error = ""
+            chunk.finished_at = timezone.now()
+        chunk.save()
+
+    if error is not None:
+        raise error
+    return chunk.result
+
+
+def aggregate_results(results: list[dict[str, Any]]) -> dict[str, Any]:
+    """Sum the numeric values of the chunks results"""
+    aggregated: dict[str, Any] = {}
+    for result in results:
+        for key, value in result.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                aggregated[key] = aggregated.get(key, 0) + value
+    return aggregated
+
+
+def finalize_job(job_id: int) -> BatchJob:
+    """Update the progress of the job from its chunks (once they were all run)"""
+    with transaction.atomic():
+        job = BatchJob.objects.select_for_update().get(id=job_id)
+        chunks = list(job.chunks.values("status", "result"))
+        completed = [
+            chunk for chunk in chunks if chunk["status"] == BatchJobChunk.Status.COMPLETED
+        ]
+
+        job.completed_chunks = len(completed)
+        job.result = aggregate_results([chunk["result"] for chunk in completed])
+        if len(completed) == len(chunks):
+            job.status = BatchJob.Status.COMPLETED
+            job.finished_at = timezone.now()
+        elif all(
+            chunk["status"] != BatchJobChunk.Status.PENDING for chunk in chunks
+        ):  # (the pending chunks are still being processed)
+            job.status = BatchJob.Status.FAILED
+        job.save()
+
+    logger.info(
+        f"Batch job {job}: {job.status} ({job.completed_chunks}/{job.total_chunks} chunks)"
+    )
+    return job
+
+
+def resume_stalled_jobs() -> int:
+    """
+    Resume the unfinished runs that haven't progressed for ``BATCH_JOB_STALLED_AFTER`` seconds
+    (e.g. the worker was killed), only the chunks below ``BATCH_CHUNK_MAX_ATTEMPTS`` are retried.
+    """
+    stalled_since = timezone.now() - datetime.timedelta(seconds=settings.BATCH_JOB_STALLED_AFTER)
+    # The progress of a run is its last checkpointed chunk (the job is only saved on start/finalize)
+    jobs = (
+        BatchJob.objects.filter(
+            status__in=[BatchJob.Status.RUNNING, BatchJob.Status.FAILED],
+            updated__lt=stalled_since,
+        )
+        .annotate(last_checkpoint=Max("chunks__updated"))
+        .filter(Q(last_checkpoint__lt=stalled_since) | Q(last_checkpoint__isnull=True))
+    )
+
+    resumed = 0
+    for job in jobs:
+        chunk_ids = list(
+            job.chunks.exclude(status=BatchJobChunk.Status.COMPLETED)
+            .filter(attempts__lt=settings.BATCH_CHUNK_MAX_ATTEMPTS)
+            .values_list("id", flat=True)
+        )
+        if not chunk_ids:
+            continue
+
+        job.status = BatchJob.Status.RUNNING
+        job.save(update_fields=["status", "updated"])
+        logger.debug(f"Batch job {job}: resuming {len(chunk_ids)} chunks.")
+        dispatch_chunks(job.pk, chunk_ids)
+        resumed += 1
+
+    return resumed
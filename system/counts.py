@@ -0,0 +1,94 @@
+"""
+Count strategies of the paginated lists (see: system.utils.NinjaCustomPagination).
+
+- "exact": a ``COUNT(*)`` on every request (the default).
+- "cached": the count is cached in Redis (for ``PAGINATION_COUNT_CACHE_TTL`` seconds), keyed by the
+  queryset SQL and parameters and by the model version, which is bumped (see: system.signals)
+  whenever a row of the model is saved or deleted.
+- "estimate": the Postgres planner estimate (``pg_class.reltuples``) for the unfiltered lists,
+  it falls back to "cached" for the filtered lists and to "exact" for the small tables.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from typing import Literal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.db import connections
+from django.db.models import Model, QuerySet
+
+CountStrategy = Literal["exact", "cached", "estimate"]
+
+CACHE_KEY_PREFIX = "pagination_count"
+
+
+def get_model_version_key(model: type[Model]) -> str:
+    return f"{CACHE_KEY_PREFIX}:version:{model._meta.label_lower}"
+
+
+def bump_model_version(model: type[Model]) -> None:
+    """Invalidate all the cached counts of the model."""
+    key = get_model_version_key(model)
+    cache.add(key, 0, timeout=None)
+    cache.incr(key)
+
+
+def get_exact_count(queryset: QuerySet) -> int:
+    return queryset.order_by().count()
+
+
+def get_cached_count(queryset: QuerySet) -> int:
+    queryset = queryset.order_by()  # (the ordering doesn't change the count)
+    try:
+        sql, params = queryset.query.sql_with_params()
+    except EmptyResultSet:
+        return 0  # The query can't match anything (e.g. ``pk__in=[]``)
+    version = cache.get(get_model_version_key(queryset.model), 0)
+    query_hash = hashlib.sha256(f"{sql}:{params!r}".encode()).hexdigest()
+
+    return cache.get_or_set(
+        f"{CACHE_KEY_PREFIX}:{queryset.model._meta.label_lower}:{version}:{query_hash}",
+        queryset.count,
+        timeout=settings.PAGINATION_COUNT_CACHE_TTL,
+    )
+
+
+def get_estimated_count(queryset: QuerySet) -> int:
+    query = queryset.query
+    if query.where or query.distinct or query.is_sliced or query.combinator:
+        # Only the unfiltered lists can be estimated
+        return get_cached_count(queryset)
+
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return get_exact_count(queryset)
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+            [queryset.model._meta.db_table],
+        )
+        row = cursor.fetchone()
+
+    estimate: int = row[0] if row else -1
+    if estimate < settings.PAGINATION_ESTIMATE_COUNT_THRESHOLD:
+        # Never analyzed (-1) or small enough to be counted exactly
+        return get_exact_count(queryset)
+
+    return estimate
+
+
+COUNT_STRATEGIES = {
+    "exact": get_exact_count,
+    "cached": get_cached_count,
+    "estimate": get_estimated_count,
+}
+
+
+def get_count(queryset: QuerySet | list, strategy: CountStrategy = "exact") -> int:
+    if not isinstance(queryset, QuerySet):
+        return len(queryset)
+    return COUNT_STRATEGIES[strategy](queryset)
@@ -0,0 +1,88 @@
+"""
+Per-request batch loading (dataloaders) for the ninja schemas resolvers.
+
+A loader collects the keys of the whole page (stashed on the request by ``NinjaCustomPagination``)
+and resolves them all in one query the first time a resolver asks for one of them, e.g:
+
+    @staticmethod
+    def resolve_total_paid_amount(invoice: Invoice, context) -> float:
+        loader = get_loader(context, "invoices_total_paid", load_total_paid, ...)
+        return loader.load(invoice.pk)
+"""
+
+from __future__ import annotations
+
+from typing import Any, Callable, Hashable, Iterable
+
+from django.http import HttpRequest
+
+PAGE_ITEMS_ATTRIBUTE = "page_items"
+
+
+class DataLoader:
+    def __init__(
+        self,
+        batch_load: Callable[[list[Any]], dict[Hashable, Any]],
+        default: Any = None,
+    ) -> None:
+        self.batch_load = batch_load
+        self.default = default
+        self.cache: dict[Hashable, Any] = {}
+        self.pending: set[Hashable] = set()
+
+    def prime(self, keys: Iterable[Hashable]) -> None:
+        """Register keys to be loaded within the next batch."""
+        self.pending.update(key for key in keys if key not in self.cache)
+
+    def load(self, key: Hashable) -> Any:
+        if key not in self.cache:
+            self.pending.add(key)
+            self.dispatch()
+        return self.cache[key]
+
+    def dispatch(self) -> None:
+        keys = list(self.pending)
+        self.pending.clear()
+
+        values = self.batch_load(keys)
+        for key in keys:
+            self.cache[key] = values.get(key, self.default)
+
+
+def set_page_items(request: HttpRequest, items: list[Any]) -> None:
+    setattr(request, PAGE_ITEMS_ATTRIBUTE, items)
+
+
+def get_page_items(request: HttpRequest, model: type) -> list[Any]:
+    """The current page items (of the given model) of a paginated response."""
+    return [item for item in getattr(request, PAGE_ITEMS_ATTRIBUTE, []) if isinstance(item, model)]
+
+
+def get_loader(
+    context: dict[str, Any] | None,
+    name: str,
+    batch_load: Callable[[list[Any]], dict[Hashable, Any]],
+    *,
+    model: type | None = None,
+    keys: Callable[[Any], Iterable[Hashable]] | None = None,
+    default: Any = None,
+) -> DataLoader:
+    """
+    Get (or create) the loader of the request (from the resolver's ``context``),
+    a new loader is primed with the keys (``keys(item)``) of the current page items of ``model``.
+    """
+    request: HttpRequest | None = context.get("request") if context else None
+    if request is None:
+        # Serialized outside of a request (no batching)
+        return DataLoader(batch_load, default=default)
+
+    loaders: dict[str, DataLoader] = request.__dict__.setdefault("_dataloaders", {})
+
+    if name not in loaders:
+        loader = DataLoader(batch_load, default=default)
+        if model is not None and keys is not None:
+            for item in get_page_items(request, model):
+                loader.prime(keys(item))
+        loaders[name] = loader
+
+    return loaders[name]
@@ -0,0 +1,164 @@
+"""
+Mail delivery over a persistent SMTP connection (one per worker process and thread).
+
+The messages are sent by batches (``MAIL_BATCH_SIZE``) with ``send_messages``, so the SMTP/TLS
+handshake is done once per worker instead of once per email. The queued messages (``queue_mail``)
+are grouped in Redis and flushed together by the ``flush_mail_queue`` task.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from smtplib import SMTPServerDisconnected
+from typing import Any
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import EmailMessage, EmailMultiAlternatives, get_connection
+from django_redis import get_redis_connection
+from loguru import logger
+
+MAIL_QUEUE_KEY = "mail:queue"
+MAIL_FLUSH_SCHEDULED_KEY = "mail:flush_scheduled"
+
+MAIL_SENT_KEY = "mail:sent"
+MAIL_FAILED_KEY = "mail:failed"
+MAIL_CONNECTIONS_KEY = "mail:connections"
+MAIL_SEND_DURATION_KEY = "mail:send_duration"  # in milliseconds
+
+_local = threading.local()
+
+
+def increment_counter(key: str, value: int = 1) -> None:
+    cache.add(key, 0, timeout=None)
+    cache.incr(key, value)
+
+
+def get_mail_connection():
+    """The persistent SMTP connection of the current process (and thread)."""
+    if getattr(_local, "connection", None) is None:
+        connection = get_connection()
+        connection.open()
+        increment_counter(MAIL_CONNECTIONS_KEY)
+        _local.connection = connection
+    return _local.connection
+
+
+def close_mail_connection() -> None:
+    connection = getattr(_local, "connection", None)
+    _local.connection = None
+    if connection is not None:
+        try:
+            connection.close()
+        except Exception as e:
+            logger.debug(f"The SMTP connection could not be closed: {e}")
+
+
+def build_message(
+    subject: str,
+    message: str,
+    recipient_list: list[str],
+    from_email: str | None = None,
+    html_message: str | None = None,
+) -> EmailMessage:
+    """Same as what ``django.core.mail.send_mail`` sends"""
+    mail = EmailMultiAlternatives(subject, message, from_email, recipient_list)
+    if html_message:
+        mail.attach_alternative(html_message, "text/html")
+    return mail
+
+
+def deliver(messages: list[EmailMessage], count_failures: bool = True) -> int:
+    """
+    Send the messages by batches over the persistent connection,
+    the connection is reopened once if the server closed it (e.g. idle timeout).
+
+    The unsent messages are counted as failed only with ``count_failures``
+    (i.e. on the last attempt, when the caller retries the delivery).
+    """
+    sent = 0
+    started = time.perf_counter()
+
+    try:
+        for index in range(0, len(messages), settings.MAIL_BATCH_SIZE):
+            batch = messages[index : index + settings.MAIL_BATCH_SIZE]
+            try:
+                sent += get_mail_connection().send_messages(batch) or 0
+            except SMTPServerDisconnected:
+                close_mail_connection()
+                sent += get_mail_connection().send_messages(batch) or 0
+    except Exception:
+        close_mail_connection()
+        if count_failures:
+            increment_counter(MAIL_FAILED_KEY, len(messages) - sent)
+        raise
+    finally:
+        increment_counter(MAIL_SENT_KEY, sent)
+        increment_counter(MAIL_SEND_DURATION_KEY, int((time.perf_counter() - started) * 1000))
+
+    logger.debug(f"{sent}/{len(messages)} emails sent.")
+    return sent
+
+
+def get_retry_delay(retries: int) -> int:
+    """Exponential backoff (in seconds) of the failed deliveries"""
+    return min(settings.MAIL_RETRY_BACKOFF * 2**retries, settings.MAIL_RETRY_BACKOFF_MAX)
+
+
+def queue_mail(
+    subject: str,
+    message: str,
+    recipient_list: list[str],
+    from_email: str | None = None,
+    html_message: str | None = None,
+) -> None:
+    """Queue the email to be sent with the others (within ``MAIL_QUEUE_FLUSH_DELAY`` seconds)"""
+    from system.tasks import flush_mail_queue
+
+    payload = {
+        "subject": subject,
+        "message": message,
+        "recipient_list": recipient_list,
+        "from_email": from_email,
+        "html_message": html_message,
+    }
+    get_redis_connection("default").rpush(MAIL_QUEUE_KEY, json.dumps(payload))
+
+    # One flush at a time is scheduled for all the queued emails
+    if cache.add(MAIL_FLUSH_SCHEDULED_KEY, 1, timeout=settings.MAIL_QUEUE_FLUSH_DELAY * 10):
+        flush_mail_queue.apply_async(countdown=settings.MAIL_QUEUE_FLUSH_DELAY)
+
+
+def pop_queued_mails(count: int) -> list[dict[str, Any]]:
+    redis = get_redis_connection("default")
+    with redis.pipeline() as pipeline:
+        pipeline.lrange(MAIL_QUEUE_KEY, 0, count - 1)
+        pipeline.ltrim(MAIL_QUEUE_KEY, count, -1)
+        payloads, _ = pipeline.execute()
+    return [json.loads(payload) for payload in payloads]
+
+
+def requeue_mails(payloads: list[dict[str, Any]]) -> None:
+    if payloads:
+        get_redis_connection("default").lpush(
+            MAIL_QUEUE_KEY, *[json.dumps(payload) for payload in reversed(payloads)]
+        )
+
+
+def get_queued_mails_count() -> int:
+    return get_redis_connection("default").llen(MAIL_QUEUE_KEY)
+
+
+def get_mail_stats() -> dict[str, Any]:
+    sent: int = cache.get(MAIL_SENT_KEY, 0)
+    duration: int = cache.get(MAIL_SEND_DURATION_KEY, 0)
+
+    return {
+        "sent": sent,
+        "failed": cache.get(MAIL_FAILED_KEY, 0),
+        "connections": cache.get(MAIL_CONNECTIONS_KEY, 0),
+        "queued": get_queued_mails_count(),
+        "emails_per_second": round(sent / (duration / 1000), 2) if duration else 0,
+    }
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-18 11:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("system", "0024_alter_protectedemail_email_type"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="attachmentfile",
+            name="fingerprint",
+            field=models.CharField(blank=True, db_index=True, max_length=64, null=True),
+        ),
+    ]
@@ -4,22 +4,36 @@ import datetime
 import os
 import random
 import string
+import time
 import uuid
 from decimal import Decimal
-from typing import Any
+from typing import Any, Iterable
 
 from django.conf import settings
-from django.db import models
+from django.core.cache import cache
+from django.db import models, transaction
 from django.template.loader import render_to_string
 from django.utils import timezone
 from loguru import logger
 
 from authentication.models import Location
+from system.mail import queue_mail
 from system.utils import send_mail_async
 
 
 class DBSettings(models.Model):
+    """
+    The settings are cached in Redis (by version), every process keeps a local copy
+    that is revalidated (by comparing the versions) every ``DB_SETTINGS_REVALIDATE_INTERVAL``,
+    any change bumps the version (see: DBSettings.invalidate) so all the processes reload them.
+    """
+
     _settings: dict[str, Any] | None = None
+    _version: int | None = None
+    _checked_at: float = 0  # the last revalidation (monotonic time)
+
+    VERSION_KEY = "db_settings:version"
+    CACHE_KEY_PREFIX = "db_settings:data"
 
     class OptionTypes(models.TextChoices):
         STR = ("str", "string")
@@ -37,35 +51,67 @@ class DBSettings(models.Model):
 
     @classmethod
     def get_settings(cls, refresh=False) -> dict[str, Any]:
-        if cls._settings is None or refresh:
-            cls._settings = {}
+        """The settings (revalidated right away if ``refresh``)"""
+        now = time.monotonic()
+        if (
+            cls._settings is not None
+            and not refresh
+            and now - cls._checked_at < settings.DB_SETTINGS_REVALIDATE_INTERVAL
+        ):
+            return cls._settings
+
+        cls._checked_at = now
+        version = cls.get_version()
+        if cls._settings is not None and cls._version == version:
+            return cls._settings  # Still up to date
+
+        cls._settings = cache.get_or_set(
+            f"{cls.CACHE_KEY_PREFIX}:{version}",
+            cls.load_settings,
+            timeout=settings.DB_SETTINGS_CACHE_TTL,
+        )
+        cls._version = version
+        return cls._settings  # type: ignore
 
-            # Fetch all the settings.
-            options = cls.objects.all()
-            for option in options:
-                cls._settings[option.option_name.upper()] = cls.parse_value(option)
+    @classmethod
+    def load_settings(cls) -> dict[str, Any]:
+        # Fetch all the settings.
+        db_settings: dict[str, Any] = {}
+        for option in cls.objects.all():
+            db_settings[option.option_name.upper()] = cls.parse_value(option)
 
-            # assign the version
-            cls._settings["VERSION"] = settings.VERSION
+        # assign the version
+        db_settings["VERSION"] = settings.VERSION
+        return db_settings
 
-        return cls._settings
+    @classmethod
+    def get_version(cls) -> int:
+        # (a new version, in case the key was evicted)
+        cache.add(cls.VERSION_KEY, time.time_ns(), timeout=None)
+        return cache.get(cls.VERSION_KEY)
+
+    @classmethod
+    def invalidate(cls) -> None:
+        """Make all the processes reload the settings"""
+        cache.add(cls.VERSION_KEY, time.time_ns(), timeout=None)
+        cache.incr(cls.VERSION_KEY)
+        cls._checked_at = 0  # (this process revalidates them right away)
 
     @classmethod
     def get(cls, key: str, default=None) -> Any:
-        if cls._settings is None:
-            cls.get_settings()
+        db_settings = cls.get_settings()
 
         if default is None:
             default = ""
 
-        value = cls._settings.get(key, "")  # type: ignore
+        value = db_settings.get(key, "")
 
         return value if value != "" else default
 
     @classmethod
     def set(cls, key: str, value: Any):
         if cls.objects.filter(option_name=key).update(option_value=value):
-            cls.get_settings(refresh=True)  # to refresh the _settings dict
+            transaction.on_commit(cls.invalidate)  # to refresh the settings of all the processes
             return True
         return False
 
@@ -138,7 +184,7 @@ class Notification(models.Model):
 
         # Add an icon
         if icon is not None:
-            title = f"{icon} {self.title}"
+            title = f"{icon} {title}"
 
         logger.debug(f"Send a notification ({receiver_email}).")
 
@@ -193,6 +239,72 @@ class Notification(models.Model):
         self.send_via_email(title, content, to=email_address, icon=icon)
         self.send_via_sms(title, content, icon=icon)
 
+    @classmethod
+    def bulk_notify(
+        cls,
+        notifications: list[Notification],
+        email_title: str | None = None,
+        email_content: str | None = None,
+        *,
+        to: list[str | None] | None = None,
+        icon: str = "🔔",
+    ) -> list[Notification]:
+        """
+        Create the (unsaved) notifications in one query and send all their emails
+        within one task (see: system.tasks.send_notification_emails).
+        ``to`` overrides the receivers emails (one per notification).
+        """
+        if not notifications:
+            return []
+
+        from system.counts import bump_model_version
+        from system.realtime import push_notifications
+        from system.tasks import send_notification_emails
+        from system.unread import increment_unread_counts
+
+        notifications = cls.objects.bulk_create(notifications)
+        bump_model_version(cls)  # (bulk_create doesn't send post_save)
+
+        notification_ids = [notification.pk for notification in notifications]
+        transaction.on_commit(
+            lambda: send_notification_emails.delay(
+                notification_ids, email_title, email_content, to=to, icon=icon
+            )
+        )
+        transaction.on_commit(lambda: push_notifications(notifications))
+        transaction.on_commit(lambda: increment_unread_counts(notifications))
+        return notifications
+
+    @classmethod
+    def fan_out(
+        cls,
+        receivers: Iterable[Any],
+        *,
+        title: str,
+        content: str,
+        event: str = EVENTS.NORMAL,
+        metadata: dict | None = None,
+        email_title: str | None = None,
+        email_content: str | None = None,
+        icon: str = "🔔",
+    ) -> list[Notification]:
+        """Send the same notification to all the receivers (users)"""
+        return cls.bulk_notify(
+            [
+                cls(
+                    title=title,
+                    event=event,
+                    content=content,
+                    receiver=receiver,
+                    metadata=metadata if metadata is not None else {},
+                )
+                for receiver in receivers
+            ],
+            email_title,
+            email_content,
+            icon=icon,
+        )
+
 
 def get_directory_path(instance: AttachmentFile, filename: str) -> str:
     ext = os.path.splitext(filename)[-1]
@@ -206,6 +318,8 @@ class AttachmentFile(models.Model):
     size = models.IntegerField(default=0)
     is_used = models.BooleanField(default=False, db_index=True)
     tag = models.CharField(max_length=100, default="", null=True, blank=True)
+    # sha256 of the rendered content (generated PDFs only, see: system.pdf)
+    fingerprint = models.CharField(max_length=64, null=True, blank=True, db_index=True)
     updated = models.DateTimeField(auto_now=True)
     created = models.DateTimeField(auto_now_add=True, db_index=True)
 
@@ -328,8 +442,8 @@ class ProtectedEmail(models.Model):
 
         content: str = render_to_string("email_templates/protected_email.html", params)
 
-        # Send the email
-        send_mail_async(
+        # Send the email (grouped with the other queued emails, e.g. the weekly reports)
+        queue_mail(
             from_email=settings.DEFAULT_FROM_EMAIL,
             subject=self.subject,
             message=content,
@@ -342,3 +456,64 @@ class ProtectedEmail(models.Model):
     def generate_passkey(self, max_length=8) -> str:
         chars = string.ascii_uppercase + string.digits
         return "".join(random.choices(chars, k=max_length))
+
+
+class BatchJob(models.Model):
+    """
+    A periodic job split into chunks of primary-key ranges (see: system.batch),
+    a run is identified by its ``run_key`` (e.g. the billed month) to be resumed instead of redone.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        RUNNING = "running", "Running"
+        COMPLETED = "completed", "Completed"
+        FAILED = "failed", "Failed"
+
+    name = models.CharField(max_length=100)
+    run_key = models.CharField(max_length=100)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
+    params = models.JSONField(default=dict, blank=True)
+    result = models.JSONField(default=dict, blank=True)
+    total_chunks = models.PositiveIntegerField(default=0)
+    completed_chunks = models.PositiveIntegerField(default=0)
+
+    finished_at = models.DateTimeField(null=True, blank=True)
+    updated = models.DateTimeField(auto_now=True)
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ("-id",)
+        constraints = [
+            models.UniqueConstraint(fields=["name", "run_key"], name="unique_batch_job_run"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.name} ({self.run_key})"
+
+
+class BatchJobChunk(models.Model):
+    """The primary-key range [start_pk, end_pk] of a batch job (processed in one transaction)"""
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        COMPLETED = "completed", "Completed"
+        FAILED = "failed", "Failed"
+
+    job = models.ForeignKey(BatchJob, on_delete=models.CASCADE, related_name="chunks")
+    start_pk = models.BigIntegerField()
+    end_pk = models.BigIntegerField()
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
+    result = models.JSONField(default=dict, blank=True)
+    error = models.TextField(blank=True, default="")
+    attempts = models.PositiveIntegerField(default=0)
+
+    finished_at = models.DateTimeField(null=True, blank=True)
+    updated = models.DateTimeField(auto_now=True)
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ("start_pk",)
+        constraints = [
+            models.UniqueConstraint(fields=["job", "start_pk"], name="unique_batch_job_chunk"),
+        ]
@@ -0,0 +1,190 @@
+"""
+PDF rendering with a content-addressed cache.
+
+The rendered HTML (plus the template name and ``PDF_TEMPLATE_VERSION``) is fingerprinted, if the
+document's current PDF attachment has the same fingerprint it is reused as is, otherwise the PDF
+is rendered (by the warm ``PDFRenderer`` of the process) and uploaded as a new ``AttachmentFile``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any
+from urllib.parse import unquote, urlparse
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.template.loader import render_to_string
+from django.utils import timezone
+from loguru import logger
+from weasyprint import CSS, HTML, default_url_fetcher
+from weasyprint.text.fonts import FontConfiguration
+
+from system.models import AttachmentFile
+
+# Seconds before retrying to fetch a resource that failed (e.g. no internet access)
+FAILED_RESOURCE_RETRY_DELAY = 300
+
+PDF_CACHE_HITS_KEY = "pdf_cache:hits"
+PDF_CACHE_MISSES_KEY = "pdf_cache:misses"
+
+# The attachment tags of the generated (and cached) PDFs
+PDF_CACHE_TAGS = ("Invoice", "Collaboration_Agreement", "Risk_Assessment", "Consent_Declaration")
+
+
+class PDFRenderer:
+    """
+    A long-lived WeasyPrint renderer, meant to be reused across renders (one per worker process).
+
+    It keeps the font configuration, the pre-parsed shared stylesheets (``PDF_STYLESHEETS``),
+    the decoded images and every fetched resource (Bootstrap, Google fonts, static images...).
+    """
+
+    def __init__(self) -> None:
+        self.base_url: str = Path(settings.PDF_TEMPLATES_DIR).as_uri() + "/"
+        self.font_config = FontConfiguration()
+        self.image_cache: dict[str, Any] = {}  # WeasyPrint's decoded images cache
+        self.resources: dict[str, dict[str, Any]] = {}
+        self.failed_resources: dict[str, tuple[Exception, float]] = {}
+        self.stylesheet_urls: set[str] = {Path(path).as_uri() for path in settings.PDF_STYLESHEETS}
+        self.stylesheets: list[CSS] = [
+            CSS(filename=path, font_config=self.font_config, url_fetcher=self.url_fetcher)
+            for path in settings.PDF_STYLESHEETS
+        ]
+
+    def url_fetcher(self, url: str) -> dict[str, Any]:
+        if url in self.stylesheet_urls:
+            # Already pre-parsed and passed to every render (see: self.stylesheets)
+            return {"string": b"", "mime_type": "text/css"}
+
+        if url in self.resources:
+            return self.resources[url]
+
+        if url in self.failed_resources:
+            # Remember failures for a while as well, to not wait on them for every render
+            exception, failed_at = self.failed_resources[url]
+            if time.monotonic() - failed_at < FAILED_RESOURCE_RETRY_DELAY:
+                raise exception
+
+        try:
+            self.resources[url] = self.fetch(url)
+        except Exception as e:
+            logger.warning(f"PDF resource could not be fetched ({url}): {e}")
+            self.failed_resources[url] = (e, time.monotonic())
+            raise
+
+        self.failed_resources.pop(url, None)
+        return self.resources[url]
+
+    def fetch(self, url: str) -> dict[str, Any]:
+        parsed_url = urlparse(url)
+        if parsed_url.scheme == "file" and parsed_url.path.startswith(settings.STATIC_URL):
+            # Static files ("{% static %}" urls)
+            path = unquote(parsed_url.path[len(settings.STATIC_URL) :])
+            url = Path(finders.find(path) or os.path.join(settings.STATIC_ROOT, path)).as_uri()
+
+        resource = default_url_fetcher(url)
+        if "file_obj" in resource:
+            file_obj = resource.pop("file_obj")
+            resource["string"] = file_obj.read()
+            file_obj.close()
+        return resource
+
+    def render(self, html_string: str) -> bytes:
+        html = HTML(string=html_string, base_url=self.base_url, url_fetcher=self.url_fetcher)
+        return html.write_pdf(
+            stylesheets=self.stylesheets, font_config=self.font_config, cache=self.image_cache
+        )
+
+
+_local = threading.local()
+
+
+def get_renderer() -> PDFRenderer:
+    """The warm renderer of the current process (and thread)."""
+    if getattr(_local, "renderer", None) is None:
+        _local.renderer = PDFRenderer()
+    return _local.renderer
+
+
+def get_fingerprint(template_name: str, html_string: str) -> str:
+    content = f"{settings.PDF_TEMPLATE_VERSION}:{template_name}:{html_string}"
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def increment_counter(key: str) -> None:
+    cache.add(key, 0, timeout=None)
+    cache.incr(key)
+
+
+def render_pdf_attachment(
+    template_name: str,
+    context: dict[str, Any],
+    name: str,
+    tag: str,
+    current: AttachmentFile | None = None,
+) -> AttachmentFile:
+    """
+    Render the template as PDF and return its attachment,
+    ``current`` (the previous PDF of the document) is reused if nothing changed, or deleted.
+    """
+    html_string = render_to_string(template_name, context)
+    fingerprint = get_fingerprint(template_name, html_string)
+
+    if current and current.fingerprint == fingerprint:
+        # Cache hit: touch the attachment (used for the LRU eviction)
+        AttachmentFile.objects.filter(id=current.pk).update(updated=timezone.now())
+        increment_counter(PDF_CACHE_HITS_KEY)
+        logger.debug(f"PDF cache hit ({name})")
+        return current
+
+    increment_counter(PDF_CACHE_MISSES_KEY)
+
+    pdf_content = get_renderer().render(html_string)
+    new_attachment = AttachmentFile(name=name, fingerprint=fingerprint, is_used=True, tag=tag)
+    new_attachment.file.save(name, ContentFile(pdf_content if pdf_content else ""), save=False)
+    new_attachment.size = new_attachment.file.size
+    new_attachment.save()
+
+    if current:
+        current.delete()  # Delete the old one in case of refresh
+
+    return new_attachment
+
+
+def get_pdf_cache_stats() -> dict[str, Any]:
+    hits: int = cache.get(PDF_CACHE_HITS_KEY, 0)
+    misses: int = cache.get(PDF_CACHE_MISSES_KEY, 0)
+
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": round(hits / (hits + misses), 4) if hits + misses else 0,
+        "entries": AttachmentFile.objects.filter(
+            tag__in=PDF_CACHE_TAGS, fingerprint__isnull=False
+        ).count(),
+        "max_entries": settings.PDF_CACHE_MAX_ENTRIES,
+    }
+
+
+def evict_pdf_cache(max_entries: int | None = None) -> int:
+    """Delete the least recently used PDFs beyond ``max_entries``, they are rendered on demand."""
+    if max_entries is None:
+        max_entries = settings.PDF_CACHE_MAX_ENTRIES
+
+    evicted_ids = list(
+        AttachmentFile.objects.filter(tag__in=PDF_CACHE_TAGS, fingerprint__isnull=False)
+        .order_by("-updated")
+        .values_list("id", flat=True)[max_entries:]
+    )
+    if evicted_ids:
+        AttachmentFile.objects.filter(id__in=evicted_ids).delete()
+
+    logger.debug(f"PDF cache: {len(evicted_ids)} attachments evicted")
+    return len(evicted_ids)
@@ -0,0 +1,52 @@
+"""
+Real-time push of the new notifications to the receivers websockets (see: chat.consumers.WsConnection),
+every connected socket of a user is in the "user_<id>" group of the channel layer.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Any
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from loguru import logger
+
+from system.models import Notification
+
+
+def get_user_group_name(user_id: int) -> str:
+    return f"user_{user_id}"
+
+
+def serialize_notification(notification: Notification) -> dict[str, Any]:
+    from system.schemas import NotificationSchema
+
+    return NotificationSchema.from_orm(notification).model_dump(mode="json")
+
+
+async def group_send_all(messages: list[tuple[str, dict[str, Any]]]) -> None:
+    channel_layer = get_channel_layer()
+    await asyncio.gather(
+        *(channel_layer.group_send(group_name, message) for group_name, message in messages)
+    )
+
+
+def push_notifications(notifications: list[Notification]) -> None:
+    """Publish the notifications to their receivers (as a "notification" event)"""
+    messages = [
+        (
+            get_user_group_name(notification.receiver_id),  # type: ignore
+            {"type": "notification", "notification": serialize_notification(notification)},
+        )
+        for notification in notifications
+        if notification.receiver_id  # type: ignore
+    ]
+    if not messages:
+        return
+
+    try:
+        async_to_sync(group_send_all)(messages)
+    except Exception as e:
+        # The notifications are persisted anyway (the push is best-effort)
+        logger.warning(f"The notifications could not be pushed: {e}")
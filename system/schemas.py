@@ -21,7 +21,7 @@ class DBSettingsSchema(Schema):
 
     @staticmethod
     def resolve_settings(list) -> dict[str, Any]:
-        return DBSettings.get_settings(refresh=True)
+        return DBSettings.get_settings()
 
 
 class NotificationSchema(ModelSchema):
@@ -45,6 +45,19 @@ class EmptyResponseSchema(Schema):
     pass
 
 
+class UnreadNotificationsCountSchema(Schema):
+    count: int
+
+
+class NotificationsReadInput(Schema):
+    ids: list[int] | None = None  # all the notifications by default
+
+
+class NotificationsReadSchema(Schema):
+    updated: int
+    unread: int
+
+
 class AttachmentFileSchema(ModelSchema):
     tag: str | None = None
 
@@ -53,6 +66,22 @@ class AttachmentFileSchema(ModelSchema):
         fields = "__all__"
 
 
+class PDFCacheStatsSchema(Schema):
+    hits: int
+    misses: int
+    hit_ratio: float
+    entries: int
+    max_entries: int
+
+
+class MailStatsSchema(Schema):
+    sent: int
+    failed: int
+    connections: int
+    queued: int
+    emails_per_second: float
+
+
 class AttachmentFilePatch(Schema):
     name: str | None = None
     size: int | None = None
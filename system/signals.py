@@ -0,0 +1,110 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from authentication.models import Location
+from client.models import (
+    ClientDetails,
+    ClientDocuments,
+    Contract,
+    Invoice,
+    InvoiceHistory,
+)
+from employees.models import ClientMedication, ClientMedicationRecord, EmployeeProfile
+from system.counts import bump_model_version
+from system.models import AttachmentFile, DBSettings, Expense, Notification
+from system.realtime import push_notifications
+from system.stats import invalidate_dashboard_stats
+from system.unread import (
+    increment_unread_counts,
+    reset_unread_count,
+    update_unread_count,
+)
+
+# The dashboard stats sections to refresh when a model changes
+DASHBOARD_STATS_SECTIONS = {
+    Location: ("locations",),
+    EmployeeProfile: ("locations",),
+    ClientDetails: ("users", "locations"),
+    ClientDocuments: ("users",),
+    Contract: ("contracts",),
+    AttachmentFile: ("medications",),
+    ClientMedication: ("medications",),
+    ClientMedicationRecord: ("medications",),
+    Invoice: ("invoices", "locations"),
+    InvoiceHistory: ("finance", "locations"),
+    Expense: ("finance", "locations"),
+}
+
+
+def refresh_dashboard_stats(sender, **kwargs):
+    invalidate_dashboard_stats(*DASHBOARD_STATS_SECTIONS[sender])
+
+
+for model in DASHBOARD_STATS_SECTIONS:
+    post_save.connect(
+        refresh_dashboard_stats,
+        sender=model,
+        dispatch_uid=f"dashboard_stats_save_{model.__name__}",
+    )
+    post_delete.connect(
+        refresh_dashboard_stats,
+        sender=model,
+        dispatch_uid=f"dashboard_stats_delete_{model.__name__}",
+    )
+
+
+# The models of the lists with a cached count (see: system.counts),
+# the audit log (CRUDEvent) is written on every change, its counts are only refreshed by the TTL.
+COUNT_CACHED_MODELS = (ClientMedicationRecord, Notification)
+
+
+def refresh_cached_counts(sender, **kwargs):
+    bump_model_version(sender)
+
+
+for model in COUNT_CACHED_MODELS:
+    post_save.connect(
+        refresh_cached_counts,
+        sender=model,
+        dispatch_uid=f"cached_counts_save_{model.__name__}",
+    )
+    post_delete.connect(
+        refresh_cached_counts,
+        sender=model,
+        dispatch_uid=f"cached_counts_delete_{model.__name__}",
+    )
+
+
+def push_new_notification(sender, instance: Notification, created: bool, **kwargs):
+    # (the bulk created notifications are pushed by Notification.bulk_notify)
+    if created:
+        transaction.on_commit(lambda: push_notifications([instance]))
+        transaction.on_commit(lambda: increment_unread_counts([instance]))
+    elif instance.receiver_id:  # type: ignore
+        # (maybe read/unread) recomputed on the next read
+        reset_unread_count(instance.receiver_id)  # type: ignore
+
+
+def refresh_unread_count(sender, instance: Notification, **kwargs):
+    if instance.receiver_id and not instance.is_read:  # type: ignore
+        update_unread_count(instance.receiver_id, -1)  # type: ignore
+
+
+post_save.connect(
+    push_new_notification,
+    sender=Notification,
+    dispatch_uid="push_new_notification",
+)
+post_delete.connect(
+    refresh_unread_count,
+    sender=Notification,
+    dispatch_uid="refresh_unread_notifications_count",
+)
+
+
+def refresh_db_settings(sender, **kwargs):
+    transaction.on_commit(DBSettings.invalidate)
+
+
+post_save.connect(refresh_db_settings, sender=DBSettings, dispatch_uid="db_settings_save")
+post_delete.connect(refresh_db_settings, sender=DBSettings, dispatch_uid="db_settings_delete")
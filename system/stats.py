@@ -0,0 +1,204 @@
+"""
+Dashboard statistics service.
+
+Every section is computed with conditional aggregation (one query per table) and cached in Redis,
+a section is invalidated (see: system.signals) when one of its models changes, so only the
+affected sections are recomputed on the next read.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Callable
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import (
+    Count,
+    DecimalField,
+    ExpressionWrapper,
+    F,
+    FloatField,
+    IntegerField,
+    OuterRef,
+    Q,
+    QuerySet,
+    Subquery,
+    Sum,
+)
+from django.db.models.functions import Coalesce
+
+from authentication.models import Location
+from client.models import (
+    ClientDetails,
+    ClientDocuments,
+    Contract,
+    Invoice,
+    InvoiceHistory,
+)
+from employees.models import ClientMedication, ClientMedicationRecord, EmployeeProfile
+from system.models import AttachmentFile, Expense
+
+CACHE_KEY_PREFIX = "dashboard_stats"
+
+
+def get_users_stats() -> dict[str, Any]:
+    stats = ClientDetails.objects.aggregate(
+        total_users=Count("id"),
+        total_in_care_users=Count("id", filter=Q(status="In Care")),
+        total_out_of_care_users=Count("id", filter=Q(status="Out Of Care")),
+        total_on_waiting_list_users=Count("id", filter=Q(status="On Waiting List")),
+    )
+
+    # The required documents (all labels except "other"), see: ClientDetails.documents_info()
+    required_labels = set(ClientDocuments.Labels.values) - {ClientDocuments.Labels.OTHER}
+    uploaded_labels_per_client = (
+        ClientDocuments.objects.filter(label__in=required_labels)
+        .order_by()
+        .values("user_id")
+        .annotate(total_labels=Count("label", distinct=True))
+        .values_list("total_labels", flat=True)
+    )
+    uploaded_labels = list(uploaded_labels_per_client)
+
+    stats["total_missing_documents"] = len(required_labels) * stats["total_users"] - sum(
+        uploaded_labels
+    )
+    stats["total_missing_documents_profiles"] = stats["total_users"] - uploaded_labels.count(
+        len(required_labels)
+    )
+    return stats
+
+
+def get_contracts_stats() -> dict[str, Any]:
+    return Contract.objects.aggregate(
+        total_contracts=Count("id"),
+        total_accommodation_contracts=Count(
+            "id", filter=Q(care_type=Contract.CareTypes.ACCOMMODATION)
+        ),
+        total_ambulante_contracts=Count("id", filter=Q(care_type=Contract.CareTypes.AMBULANTE)),
+        total_approved_contracts=Count("id", filter=Q(status=Contract.Status.APPROVED)),
+        total_stopped_contracts=Count("id", filter=Q(status=Contract.Status.STOPPED)),
+        total_terminated_contracts=Count("id", filter=Q(status=Contract.Status.TERMINATED)),
+    )
+
+
+def get_medications_stats() -> dict[str, Any]:
+    return {
+        "total_attachments": AttachmentFile.objects.filter(is_used=True).count(),
+        **ClientMedication.objects.aggregate(
+            total_medications=Count("id"),
+            total_critical_medications=Count("id", filter=Q(is_critical=True)),
+        ),
+        **ClientMedicationRecord.objects.aggregate(
+            total_medication_records=Count("id"),
+            total_taken_medication_records=Count(
+                "id", filter=Q(status=ClientMedicationRecord.Status.TAKEN)
+            ),
+            total_not_taken_medication_records=Count(
+                "id", filter=Q(status=ClientMedicationRecord.Status.NOT_TAKEN)
+            ),
+            total_waiting_medication_records=Count(
+                "id", filter=Q(status=ClientMedicationRecord.Status.AWAITING)
+            ),
+        ),
+    }
+
+
+def get_invoices_stats() -> dict[str, Any]:
+    return Invoice.objects.aggregate(
+        total_invoices=Count("id"),
+        total_paid_invoices=Count("id", filter=Q(status=Invoice.Status.PAID)),
+        total_partially_paid_invoices=Count("id", filter=Q(status=Invoice.Status.PARTIALLY_PAID)),
+        total_outstanding_invoices=Count("id", filter=Q(status=Invoice.Status.OUTSTANDING)),
+        total_overpaid_invoices=Count("id", filter=Q(status=Invoice.Status.OVERPAID)),
+    )
+
+
+def get_expenses_total():
+    """The tax-inclusive expenses total (to be aggregated)"""
+    return Sum(ExpressionWrapper(F("amount") * (1 + F("tax") / 100), output_field=FloatField()))
+
+
+def get_finance_stats() -> dict[str, Any]:
+    return {
+        "total_paid_amount": InvoiceHistory.objects.aggregate(total=Sum("amount"))["total"],
+        # The costs/charges (outcome)
+        "total_expenses": Expense.objects.aggregate(total=get_expenses_total())["total"],
+    }
+
+
+def per_location(queryset: QuerySet, location_field: str, total, output_field) -> Coalesce:
+    """A correlated subquery aggregating the queryset for each location."""
+    subquery = (
+        queryset.filter(**{location_field: OuterRef("pk")})
+        .order_by()
+        .values(location_field)
+        .annotate(total=total)
+        .values("total")
+    )
+    return Coalesce(Subquery(subquery, output_field=output_field), 0, output_field=output_field)
+
+
+def annotate_locations_stats(locations: QuerySet[Location]) -> QuerySet[Location]:
+    return locations.annotate(
+        total_employees=per_location(
+            EmployeeProfile.objects.all(), "location", Count("id"), IntegerField()
+        ),
+        total_clients=per_location(
+            ClientDetails.objects.all(), "location", Count("id"), IntegerField()
+        ),
+        total_expenses=per_location(
+            Expense.objects.all(), "location", get_expenses_total(), FloatField()
+        ),
+        # The revenue is what was paid for the invoices of the location clients
+        total_revenue=per_location(
+            InvoiceHistory.objects.all(),
+            "invoice__client__location",
+            Sum("amount"),
+            DecimalField(max_digits=20, decimal_places=2),
+        ),
+    )
+
+
+def get_locations_stats() -> list[dict[str, Any]]:
+    """All the locations stats in one grouped query"""
+    return [
+        {
+            "location_name": location.name,
+            "location_id": location.pk,
+            "location_capacity": location.capacity,
+            "total_employees": location.total_employees,
+            "total_clients": location.total_clients,
+            "total_expenses": float(location.total_expenses),
+            "total_revenue": float(location.total_revenue),
+        }
+        for location in annotate_locations_stats(Location.objects.order_by("id"))
+    ]
+
+
+SECTIONS: dict[str, Callable[[], Any]] = {
+    "users": get_users_stats,
+    "contracts": get_contracts_stats,
+    "medications": get_medications_stats,
+    "invoices": get_invoices_stats,
+    "finance": get_finance_stats,
+    "locations": get_locations_stats,
+}
+
+DASHBOARD_SECTIONS = ("users", "contracts", "medications", "invoices", "finance")
+
+
+def get_section_stats(section: str) -> Any:
+    return cache.get_or_set(
+        f"{CACHE_KEY_PREFIX}:{section}",
+        SECTIONS[section],
+        timeout=settings.DASHBOARD_STATS_CACHE_TTL,
+    )
+
+
+def get_dashboard_stats() -> dict[str, dict[str, Any]]:
+    return {section: get_section_stats(section) for section in DASHBOARD_SECTIONS}
+
+
+def invalidate_dashboard_stats(*sections: str) -> None:
+    cache.delete_many([f"{CACHE_KEY_PREFIX}:{section}" for section in sections])
@@ -0,0 +1,132 @@
+from smtplib import SMTPException
+
+from celery.signals import worker_process_init, worker_process_shutdown
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import EmailMessage
+from loguru import logger
+
+from celery import current_app, shared_task
+from system import batch, mail, pdf
+from system.models import Notification
+
+
+@shared_task
+def evict_pdf_cache():
+    logger.debug("Task: Evict the least recently used generated PDFs.")
+    return pdf.evict_pdf_cache()
+
+
+@shared_task
+def send_notification_emails(
+    notification_ids: list[int],
+    email_title: str | None = None,
+    email_content: str | None = None,
+    *,
+    to: list[str | None] | None = None,
+    icon: str = "🔔",
+) -> int:
+    """Send the emails of the notifications (see: Notification.bulk_notify) by batches"""
+    notifications = Notification.objects.filter(id__in=notification_ids).select_related(
+        "receiver__profile", "receiver__Client_Profile"
+    )
+    notifications_by_id = {notification.pk: notification for notification in notifications}
+    receivers_emails = to if to is not None else [None] * len(notification_ids)
+
+    messages: list[EmailMessage] = []
+    for notification_id, receiver_email in zip(notification_ids, receivers_emails):
+        notification = notifications_by_id.get(notification_id)
+        if notification is None:
+            continue
+
+        receiver_email = receiver_email or notification.get_receiver_email()
+        if not receiver_email:
+            continue
+
+        title = email_title if email_title is not None else notification.title
+        if icon is not None:
+            title = f"{icon} {title}"
+
+        messages.append(
+            EmailMessage(
+                subject=title,
+                body=email_content if email_content is not None else notification.content,
+                to=[receiver_email],
+            )
+        )
+
+    try:
+        sent = mail.deliver(messages)
+    except (SMTPException, OSError) as e:
+        # (the notifications emails are not critical)
+        logger.warning(f"Task: the notification emails could not be sent: {e}")
+        return 0
+
+    logger.debug(f"Task: {sent}/{len(messages)} notification emails sent.")
+    return sent
+
+
+@shared_task(bind=True, max_retries=settings.MAIL_MAX_RETRIES)
+def flush_mail_queue(self) -> int:
+    """
+    Send the queued emails (see: system.mail.queue_mail) by batches, it also runs periodically
+    to send the emails left in the queue once the retries are exhausted.
+    """
+    cache.delete(mail.MAIL_FLUSH_SCHEDULED_KEY)  # the next queued emails schedule a new flush
+    is_last_attempt = self.request.retries >= self.max_retries
+
+    sent = 0
+    while payloads := mail.pop_queued_mails(settings.MAIL_BATCH_SIZE):
+        try:
+            sent += mail.deliver(
+                [mail.build_message(**payload) for payload in payloads],
+                count_failures=is_last_attempt,
+            )
+        except (SMTPException, OSError) as e:
+            # NOTE: the emails of the batch sent before the failure are sent again (at least once)
+            mail.requeue_mails(payloads)
+            if is_last_attempt:
+                logger.error(f"Task: the queued emails could not be sent (kept queued): {e}")
+                raise
+            raise self.retry(exc=e, countdown=mail.get_retry_delay(self.request.retries))
+
+    logger.debug(f"Task: {sent} queued emails sent.")
+    return sent
+
+
+@shared_task(bind=True, max_retries=settings.BATCH_CHUNK_MAX_RETRIES)
+def run_batch_chunk(self, chunk_id: int) -> dict | None:
+    """Process a chunk of a batch job (see: system.batch)"""
+    try:
+        return batch.run_chunk(chunk_id)
+    except Exception as e:
+        if self.request.retries < self.max_retries:
+            raise self.retry(
+                exc=e, countdown=settings.BATCH_CHUNK_RETRY_DELAY * 2**self.request.retries
+            )
+        # The chunk is left as failed (to be resumed), the job callback must run anyway
+        return None
+
+
+@shared_task
+def finalize_batch_job(job_id: int) -> str:
+    return batch.finalize_job(job_id).status
+
+
+@shared_task
+def resume_batch_jobs() -> int:
+    logger.debug("Task: Resume the stalled batch jobs.")
+    return batch.resume_stalled_jobs()
+
+
+@worker_process_init.connect
+def warm_up_pdf_renderer(**kwargs):
+    # Load the fonts and the shared stylesheets once per process of the "pdf" workers only
+    # (the queues selected with -Q are inherited from the main worker process)
+    if "pdf" in current_app.amqp.queues.consume_from:
+        pdf.get_renderer()
+
+
+@worker_process_shutdown.connect
+def close_mail_connection(**kwargs):
+    mail.close_mail_connection()
@@ -0,0 +1,83 @@
+"""
+Per-user unread notifications counter (cached in Redis).
+
+The counter is incremented when notifications are created and decremented when they are read,
+on a cache miss (or after any other change) it's recomputed from the database.
+"""
+
+from __future__ import annotations
+
+from collections import Counter
+from typing import Iterable
+
+from django.conf import settings
+from django.core.cache import cache
+
+from system.models import Notification
+
+CACHE_KEY_PREFIX = "notifications:unread"
+
+
+def get_unread_key(user_id: int) -> str:
+    return f"{CACHE_KEY_PREFIX}:{user_id}"
+
+
+def get_unread_stale_key(user_id: int) -> str:
+    return f"{CACHE_KEY_PREFIX}:stale:{user_id}"
+
+
+def get_unread_count(user_id: int) -> int:
+    key = get_unread_key(user_id)
+    count: int | None = cache.get(key)
+    if count is None:
+        stale_key = get_unread_stale_key(user_id)
+        cache.delete(stale_key)
+        count = Notification.objects.filter(receiver_id=user_id, is_read=False).count()
+        # (add: don't override a counter set meanwhile)
+        cache.add(key, count, timeout=settings.UNREAD_NOTIFICATIONS_CACHE_TTL)
+
+        # A change applied between the count and the add was missed (see: update_unread_count),
+        # the counter is computed again on the next read
+        if cache.get(stale_key):
+            cache.delete(key)
+    return count
+
+
+def update_unread_count(user_id: int, delta: int) -> None:
+    """Apply the delta on the cached counter (if any, otherwise it's computed on the next read)"""
+    key = get_unread_key(user_id)
+    try:
+        count = cache.incr(key, delta)
+    except ValueError:
+        # Not cached, but a counter being computed meanwhile may miss this change
+        cache.set(get_unread_stale_key(user_id), 1, timeout=60)
+        return
+
+    if count < 0:
+        cache.delete(key)  # Out of sync
+
+
+def increment_unread_counts(notifications: Iterable[Notification]) -> None:
+    counts = Counter(
+        notification.receiver_id  # type: ignore
+        for notification in notifications
+        if notification.receiver_id and not notification.is_read  # type: ignore
+    )
+    for user_id, count in counts.items():
+        update_unread_count(user_id, count)
+
+
+def reset_unread_count(user_id: int) -> None:
+    cache.delete(get_unread_key(user_id))
+
+
+def mark_as_read(user_id: int, notification_ids: list[int] | None = None) -> int:
+    """Mark the user's notifications (all by default) as read in one UPDATE"""
+    notifications = Notification.objects.filter(receiver_id=user_id, is_read=False)
+    if notification_ids is not None:
+        notifications = notifications.filter(id__in=notification_ids)
+
+    updated = notifications.update(is_read=True)
+    if updated:
+        update_unread_count(user_id, -updated)
+    return updated
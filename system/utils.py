@@ -1,48 +1,170 @@
+import base64
+import datetime
+import json
+from smtplib import SMTPException
 from typing import Any, Optional
 
 from django.conf import settings
-from django.core.mail import send_mail
+from django.db.models import Q
 from loguru import logger
 from ninja import Field, Schema
+from ninja.errors import HttpError
 from ninja.pagination import PaginationBase
 
 from celery import shared_task
+from system import mail
+from system.counts import CountStrategy, get_count
+from system.loaders import set_page_items
 
 
-@shared_task
-def send_mail_async(*args, recipient_list=None, **kwargs):
-    if recipient_list is not None:
-        logger.debug("Send an email to:", recipient_list)
-        return send_mail(*args, recipient_list=recipient_list, **kwargs)
+@shared_task(bind=True, max_retries=settings.MAIL_MAX_RETRIES)
+def send_mail_async(
+    self,
+    subject: str,
+    message: str,
+    from_email: str | None = None,
+    recipient_list: list[str] | None = None,
+    fail_silently: bool = False,
+    html_message: str | None = None,
+) -> int:
+    """Same as ``send_mail`` but over the persistent SMTP connection of the worker, with retries"""
+    if recipient_list is None:
+        return 0
+
+    logger.debug(f"Send an email to: {recipient_list}")
+    will_retry = not self.request.called_directly and self.request.retries < self.max_retries
+    try:
+        return mail.deliver(
+            [mail.build_message(subject, message, recipient_list, from_email, html_message)],
+            count_failures=not will_retry,
+        )
+    except (SMTPException, OSError) as e:
+        if will_retry:
+            raise self.retry(exc=e, countdown=mail.get_retry_delay(self.request.retries))
+        if fail_silently:
+            logger.warning(f"The email could not be sent to {recipient_list}: {e}")
+            return 0
+        raise
+
+
+def encode_cursor(values: list[Any]) -> str:
+    def default(value: Any) -> str:
+        if isinstance(value, (datetime.date, datetime.time)):
+            return value.isoformat()  # (keeps the microseconds)
+        return str(value)
+
+    return base64.urlsafe_b64encode(json.dumps(values, default=default).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> list[Any]:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        raise HttpError(400, "Invalid pagination cursor")
+
+    if not isinstance(values, list):
+        raise HttpError(400, "Invalid pagination cursor")
+    return values
+
+
+def keyset_filter(ordering: tuple[str, ...], values: list[Any]) -> Q:
+    """
+    The rows after the given (ordering) values, e.g for ("-created", "-id"):
+    created < value_0 OR (created = value_0 AND id < value_1)
+    """
+    if len(values) != len(ordering):
+        raise HttpError(400, "Invalid pagination cursor")
+
+    condition = Q()
+    for index, field in enumerate(ordering):
+        lookup = "lt" if field.startswith("-") else "gt"
+        field_condition = Q(**{f"{field.lstrip('-')}__{lookup}": values[index]})
+        for previous_field, previous_value in zip(ordering[:index], values[:index]):
+            field_condition &= Q(**{previous_field.lstrip("-"): previous_value})
+        condition |= field_condition
+
+    return condition
 
 
 class NinjaCustomPagination(PaginationBase):
+    """
+    Page number pagination, with an optional keyset (cursor) mode for the endpoints
+    declaring their ordering key, e.g: ``@paginate(NinjaCustomPagination, ordering=("-created", "-id"))``
+
+    In cursor mode every response has a "next_cursor" to be passed as "cursor" to get the next
+    page (without OFFSET), and the count is only computed when requested ("with_count").
+
+    The count can be cached or estimated per endpoint with ``count_strategy`` (see: system.counts).
+    """
+
     class Input(Schema):
         page: int | None = Field(None, gt=0)
         page_size: int | None = Field(None, gt=0)
+        cursor: str | None = None
+        with_count: bool = False  # (cursor mode only)
 
     class Output(Schema):
         results: list[Any]
         page_size: int
-        count: int
+        count: int | None = None
+        next_cursor: str | None = None
 
     items_attribute: str = "results"
 
-    def __init__(self, page_size: int = settings.NINJA_PAGINATION_PER_PAGE, **kwargs: Any) -> None:
+    def __init__(
+        self,
+        page_size: int = settings.NINJA_PAGINATION_PER_PAGE,
+        ordering: tuple[str, ...] | None = None,
+        count_strategy: CountStrategy = "exact",
+        **kwargs: Any,
+    ) -> None:
         self.page_size = page_size
+        self.ordering = ordering  # the keyset of the cursor mode (must be unique)
+        self.count_strategy = count_strategy
         super().__init__(**kwargs)
 
     def paginate_queryset(self, queryset, pagination: Input, **params):
-        if pagination.page is None:
-            pagination.page = 1
+        page: int = pagination.page or 1
+        page_size: int = pagination.page_size or self.page_size
+
+        if self.ordering is None:
+            offset = (page - 1) * page_size
+            results = list(queryset[offset : offset + page_size])
+            # Used by the dataloaders to batch the resolvers queries (see: system.loaders)
+            set_page_items(params["request"], results)
+
+            return {
+                "results": results,
+                "count": get_count(queryset, self.count_strategy),
+                "page_size": page_size,
+            }
+
+        # Keyset (cursor) mode
+        queryset = queryset.order_by(*self.ordering)
+        count: int | None = None
+        if pagination.cursor is None or pagination.with_count:
+            count = get_count(queryset, self.count_strategy)
+
+        if pagination.cursor:
+            values = decode_cursor(pagination.cursor)
+            results = list(queryset.filter(keyset_filter(self.ordering, values))[: page_size + 1])
+        else:
+            offset = (page - 1) * page_size
+            results = list(queryset[offset : offset + page_size + 1])
 
-        if pagination.page_size is not None:
-            self.page_size = pagination.page_size
+        next_cursor: str | None = None
+        if len(results) > page_size:
+            results = results[:page_size]
+            last_item = results[-1]
+            next_cursor = encode_cursor(
+                [getattr(last_item, field.lstrip("-")) for field in self.ordering]
+            )
 
-        offset = (pagination.page - 1) * self.page_size
+        set_page_items(params["request"], results)
 
         return {
-            "results": queryset[offset : offset + self.page_size],
-            "count": self._items_count(queryset),
-            "page_size": self.page_size,
+            "results": results,
+            "count": count,
+            "page_size": page_size,
+            "next_cursor": next_cursor,
         }